@@ -19,10 +19,18 @@ script_dir = Path(__file__).parent
 sys.path.insert(0, str(script_dir))
 
 try:
-    from memory_manager import get_db_connection, get_statistics, DEFAULT_DB_PATH, get_project_root
+    from memory_manager import (
+        get_db_connection, get_statistics, ingest_spool, run_maintenance,
+        DEFAULT_DB_PATH, HEARTBEAT_MAINTAIN_BUDGET, get_project_root
+    )
 except ImportError:
     def get_statistics(*args, **kwargs):
         return {}
+    def ingest_spool(*args, **kwargs):
+        return {}
+    def run_maintenance(*args, **kwargs):
+        return {}
+    HEARTBEAT_MAINTAIN_BUDGET = 0.25
     def get_project_root():
         return Path.cwd()
     DEFAULT_DB_PATH = get_project_root() / ".agent" / "brain" / "memory.db"
@@ -34,6 +42,27 @@ def check_security():
     return True
 
 
+def ingest_captures():
+    """Drain observations spooled by `memory_manager.py capture` into the database."""
+    try:
+        counts = ingest_spool()
+        if counts.get("observations"):
+            print(f"[Memória] ✓ {counts['observations']} observações ingeridas do spool.")
+    except Exception as e:
+        print(f"[Memória] ⚠ Erro ao ingerir spool: {e}")
+
+
+def run_retention():
+    """Apply the retention policy a little at a time (resumes on the next heartbeat)."""
+    try:
+        report = run_maintenance(budget_seconds=HEARTBEAT_MAINTAIN_BUDGET)
+        if report.get("observations_rolled_up") or report.get("reclaimed_bytes", 0) > 0:
+            print(f"[Manutenção] ✓ {report['observations_rolled_up']} observações agregadas, "
+                  f"{report['reclaimed_bytes'] // 1024} KB recuperados.")
+    except Exception as e:
+        print(f"[Manutenção] ⚠ Erro na manutenção: {e}")
+
+
 def check_errors():
     """Check for recent errors in observations."""
     try:
@@ -129,9 +158,11 @@ def main():
     print(f"--- Executando Heartbeat ({datetime.now().strftime('%H:%M:%S')}) ---")
     
     check_security()
+    ingest_captures()
     check_errors()
     analyze_patterns()
     check_memory()
+    run_retention()
     
     print("--- Heartbeat Concluído ---")
 
@@ -11,22 +11,74 @@ Usage:
     python3 memory_manager.py store_observation --session-id ID --tool NAME --input DATA --output DATA
     python3 memory_manager.py compress_session --session-id ID --transcript FILE
     python3 memory_manager.py query --text "search query"
+    python3 memory_manager.py stats [--recount]             # O(1) counters; --recount repairs drift
+    python3 memory_manager.py capture "what happened"       # Append to the capture spool
+    python3 memory_manager.py ingest                        # Drain the capture spool into SQLite
+    python3 memory_manager.py import FILE --task "..."      # Bulk-load a JSONL transcript / export
+    python3 memory_manager.py maintain [--budget SECONDS]   # Retention, rollups and compaction
+    python3 memory_manager.py fts rebuild|optimize|integrity-check
 """
 
 import argparse
+import atexit
+import codecs
 import hashlib
 import json
+import lzma
+import math
 import os
+import queue
+import re
 import sqlite3
 import sys
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
 from uuid import uuid4
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, the spool is never truncated
+    fcntl = None
 
 # Configuration
 MAX_RETRIEVAL_LIMIT = 10
+SCHEMA_VERSION = 1            # PRAGMA user_version written by init_schema; bump when it changes
 TEMPORAL_DECAY_FACTOR = 0.9
+TEMPORAL_DECAY_DAYS = 7       # Score is multiplied by TEMPORAL_DECAY_FACTOR per this many days of age
+CONTEXT_CANDIDATE_POOL = 4    # load_context ranks up to limit * this many candidates per kind
+
+# Observation payloads: small ones stay inline, larger ones are stored once
+# per distinct content in the compressed, reference-counted blobs table
+INLINE_PAYLOAD_SIZE = 256     # Characters kept in the observations row itself
+COLD_BLOB_DAYS = 7            # recompress_blobs() moves older zlib blobs to lzma
+BLOB_CHUNK_SIZE = 256 * 1024  # Larger payloads are stored and read as chunks of this many bytes
+
+# Background observation writer (queue_observation)
+WRITER_BATCH_SIZE = 500       # Commit as soon as this many observations are pending
+WRITER_FLUSH_INTERVAL = 0.2   # ...or this many seconds after the oldest one was queued
+WRITER_QUEUE_SIZE = 10000     # queue_observation blocks (back-pressure) when full
+
+# Capture spool: hooks append JSON lines, ingest drains them in bulk
+SPOOL_FILE = "capture.jsonl"
+INGEST_BATCH_SIZE = 5000      # Spool lines per ingest transaction
+IMPORT_CHUNK_SIZE = 10000     # Observations per import transaction
+
+# Retention (maintain): raw observations are rolled up per hour, tool and
+# project once they expire, then deleted in batches
+RETENTION_POLICY = {
+    "raw_days": 30,           # Keep raw observations this long
+    "rollup_days": 365,       # Keep hourly rollups this long
+}
+MAINTAIN_BATCH_SIZE = 2000    # Observations rolled up / deleted per transaction
+MAINTAIN_VACUUM_PAGES = 2000  # Free pages returned to the OS per incremental_vacuum step
+HEARTBEAT_MAINTAIN_BUDGET = 0.25  # Seconds of maintenance per heartbeat
+FTS_TABLES = ("sessions_fts", "observations_fts", "learnings_fts")
 
 
 def get_project_root() -> Path:
@@ -68,166 +120,1645 @@ def get_default_db_path() -> Path:
 DEFAULT_DB_PATH = get_default_db_path()
 
 
-def get_db_connection(db_path: Optional[Path] = None) -> sqlite3.Connection:
-    """Get a connection to the SQLite database."""
-    path = db_path or DEFAULT_DB_PATH
+# SQLite tuning applied to every connection: WAL lets hooks write while
+# heartbeat / nightly_review read, and synchronous=NORMAL only fsyncs at
+# checkpoints instead of on every commit
+PRAGMA_PROFILE = {
+    "auto_vacuum": "INCREMENTAL",  # Only takes effect on new databases (see maintain --vacuum)
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,        # ms to wait on a locked database
+    "cache_size": -16384,        # KiB (16 MB page cache)
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    """Open a connection with the pragma profile applied."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(path))
+    # check_same_thread=False only so close() can run from another thread;
+    # each thread still gets its own connection from MemoryStore
+    conn = sqlite3.connect(str(path), check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMA_PROFILE.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    try:
+        conn.execute("SELECT pow(1, 1)")
+    except sqlite3.OperationalError:  # SQLite built without math functions
+        conn.create_function("pow", 2, math.pow, deterministic=True)
     return conn
 
 
-def init_database(db_path: Optional[Path] = None) -> None:
-    """Initialize the database schema if it doesn't exist."""
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    # Sessions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            project_path TEXT NOT NULL,
-            start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            end_time TIMESTAMP,
-            summary TEXT,
-            token_usage INTEGER DEFAULT 0,
-            success_score REAL DEFAULT 0.0,
-            task_description TEXT,
-            conversation_id TEXT
-        )
-    """)
-    
-    # Observations table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS observations (
-            observation_id TEXT PRIMARY KEY,
-            session_id TEXT REFERENCES sessions(session_id),
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            tool_name TEXT,
-            input_data TEXT,
-            output_data TEXT,
-            context_snapshot TEXT,
-            execution_time_ms INTEGER,
-            success BOOLEAN DEFAULT TRUE
-        )
-    """)
-    
-    # Mutations table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS mutations (
-            mutation_id TEXT PRIMARY KEY,
-            session_id TEXT REFERENCES sessions(session_id),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            inefficiency_type TEXT,
-            mutation_strategy TEXT,
-            confidence_score REAL,
-            applied BOOLEAN DEFAULT FALSE,
-            outcome TEXT,
-            rollback_data TEXT
-        )
-    """)
-    
-    # Learnings table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS learnings (
-            learning_id TEXT PRIMARY KEY,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            pattern_type TEXT,
-            description TEXT,
-            frequency INTEGER DEFAULT 1,
-            confidence_score REAL DEFAULT 0.5,
-            cross_project_refs TEXT,
-            source_sessions TEXT
-        )
-    """)
-    
-    # Context snapshots table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS context_snapshots (
-            snapshot_id TEXT PRIMARY KEY,
-            session_id TEXT REFERENCES sessions(session_id),
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            compressed_context TEXT,
-            retrieval_priority INTEGER DEFAULT 5,
-            critical_facts TEXT
-        )
-    """)
-    
-    # FTS5 virtual table for semantic search on sessions
-    cursor.execute("""
-        CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
-            session_id,
-            summary,
-            task_description,
-            content='sessions',
-            content_rowid='rowid'
-        )
-    """)
-    
-    # FTS5 virtual table for observations
-    cursor.execute("""
-        CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5(
-            observation_id,
-            tool_name,
-            context_snapshot,
-            content='observations',
-            content_rowid='rowid'
-        )
-    """)
-    
-    # FTS5 virtual table for learnings
-    cursor.execute("""
-        CREATE VIRTUAL TABLE IF NOT EXISTS learnings_fts USING fts5(
-            learning_id,
-            pattern_type,
-            description,
-            content='learnings',
-            content_rowid='rowid'
-        )
-    """)
-    
-    # Triggers to keep FTS in sync
-    cursor.execute("""
-        CREATE TRIGGER IF NOT EXISTS sessions_ai AFTER INSERT ON sessions BEGIN
-            INSERT INTO sessions_fts(rowid, session_id, summary, task_description)
-            VALUES (new.rowid, new.session_id, new.summary, new.task_description);
+def _fts_match(text: str) -> str:
+    """FTS5 MATCH expression for free text: all of its words, quoted so punctuation can't break the syntax."""
+    terms = re.findall(r"\w+", text or "")
+    return " ".join(f'"{term}"' for term in terms) or '""'  # "" matches nothing
+
+
+def get_db_connection(db_path: Optional[Path] = None) -> sqlite3.Connection:
+    """Get a new (tuned) connection to the SQLite database; the caller closes it."""
+    return _connect(Path(db_path or DEFAULT_DB_PATH))
+
+
+# Rows keep their own IDs (spool / import re-reads are ignored) and
+# timestamps (NULL = now)
+_INSERT_OBSERVATION = """
+    INSERT OR IGNORE INTO observations (
+        observation_id, session_id, tool_name, input_data, input_blob, output_data, output_blob,
+        context_snapshot, execution_time_ms, success, timestamp
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+"""
+
+_OBSERVATIONS_AI_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS observations_ai AFTER INSERT ON observations BEGIN
+        INSERT INTO observations_fts(rowid, observation_id, tool_name, context_snapshot)
+        VALUES (new.rowid, new.observation_id, new.tool_name, new.context_snapshot);
+    END
+"""
+
+
+def _has_schema_object(conn: sqlite3.Connection, kind: str, name: str) -> bool:
+    """Whether sqlite_master has a table / trigger / index of that name."""
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = ? AND name = ?", (kind, name)
+    ).fetchone() is not None
+
+
+# scored_sessions / success_score_sum only cover sessions with success_score > 0
+# (the average get_statistics reports)
+_COUNTER_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_count_ai AFTER INSERT ON sessions BEGIN
+        UPDATE counters SET value = value + CASE name
+            WHEN 'sessions' THEN 1
+            WHEN 'scored_sessions' THEN COALESCE(new.success_score, 0) > 0
+            WHEN 'success_score_sum' THEN MAX(COALESCE(new.success_score, 0), 0)
+            WHEN 'projects' THEN NOT EXISTS (
+                SELECT 1 FROM project_counters WHERE project_path = new.project_path AND sessions > 0
+            )
         END
-    """)
-    
-    cursor.execute("""
-        CREATE TRIGGER IF NOT EXISTS sessions_au AFTER UPDATE ON sessions BEGIN
-            INSERT INTO sessions_fts(sessions_fts, rowid, session_id, summary, task_description)
-            VALUES ('delete', old.rowid, old.session_id, old.summary, old.task_description);
-            INSERT INTO sessions_fts(rowid, session_id, summary, task_description)
-            VALUES (new.rowid, new.session_id, new.summary, new.task_description);
+        WHERE name IN ('sessions', 'scored_sessions', 'success_score_sum', 'projects');
+        INSERT INTO project_counters (project_path, sessions) VALUES (new.project_path, 1)
+        ON CONFLICT (project_path) DO UPDATE SET sessions = sessions + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_count_au AFTER UPDATE OF success_score ON sessions BEGIN
+        UPDATE counters SET value = value + CASE name
+            WHEN 'scored_sessions' THEN (COALESCE(new.success_score, 0) > 0) - (COALESCE(old.success_score, 0) > 0)
+            WHEN 'success_score_sum' THEN MAX(COALESCE(new.success_score, 0), 0) - MAX(COALESCE(old.success_score, 0), 0)
         END
-    """)
-    
-    cursor.execute("""
-        CREATE TRIGGER IF NOT EXISTS observations_ai AFTER INSERT ON observations BEGIN
-            INSERT INTO observations_fts(rowid, observation_id, tool_name, context_snapshot)
-            VALUES (new.rowid, new.observation_id, new.tool_name, new.context_snapshot);
+        WHERE name IN ('scored_sessions', 'success_score_sum');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_count_ad AFTER DELETE ON sessions BEGIN
+        UPDATE project_counters SET
+            sessions = sessions - 1,
+            observations = observations - (SELECT COUNT(*) FROM observations WHERE session_id = old.session_id)
+        WHERE project_path = old.project_path;
+        UPDATE counters SET value = value - CASE name
+            WHEN 'sessions' THEN 1
+            WHEN 'scored_sessions' THEN COALESCE(old.success_score, 0) > 0
+            WHEN 'success_score_sum' THEN MAX(COALESCE(old.success_score, 0), 0)
+            WHEN 'projects' THEN EXISTS (
+                SELECT 1 FROM project_counters WHERE project_path = old.project_path AND sessions <= 0
+            )
         END
+        WHERE name IN ('sessions', 'scored_sessions', 'success_score_sum', 'projects');
+        DELETE FROM project_counters WHERE project_path = old.project_path AND sessions <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS observations_count_ai AFTER INSERT ON observations BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'observations';
+        UPDATE project_counters SET observations = observations + 1
+        WHERE project_path = (SELECT project_path FROM sessions WHERE session_id = new.session_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS observations_count_ad AFTER DELETE ON observations BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'observations';
+        UPDATE project_counters SET observations = observations - 1
+        WHERE project_path = (SELECT project_path FROM sessions WHERE session_id = old.session_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mutations_count_ai AFTER INSERT ON mutations BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'mutations';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mutations_count_ad AFTER DELETE ON mutations BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'mutations';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS learnings_count_ai AFTER INSERT ON learnings BEGIN
+        UPDATE counters SET value = value + 1 WHERE name = 'learnings';
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS learnings_count_ad AFTER DELETE ON learnings BEGIN
+        UPDATE counters SET value = value - 1 WHERE name = 'learnings';
+    END
+    """,
+)
+
+
+def _recount(conn: sqlite3.Connection) -> None:
+    """Recompute counters and project_counters from the tables (caller holds the transaction)."""
+    conn.execute("DELETE FROM counters")
+    conn.execute("""
+        INSERT INTO counters (name, value)
+        SELECT 'sessions', COUNT(*) FROM sessions
+        UNION ALL SELECT 'scored_sessions', COUNT(*) FROM sessions WHERE success_score > 0
+        UNION ALL SELECT 'success_score_sum', COALESCE(SUM(success_score), 0) FROM sessions WHERE success_score > 0
+        UNION ALL SELECT 'projects', COUNT(DISTINCT project_path) FROM sessions
+        UNION ALL SELECT 'observations', COUNT(*) FROM observations
+        UNION ALL SELECT 'mutations', COUNT(*) FROM mutations
+        UNION ALL SELECT 'learnings', COUNT(*) FROM learnings
     """)
-    
-    cursor.execute("""
-        CREATE TRIGGER IF NOT EXISTS learnings_ai AFTER INSERT ON learnings BEGIN
-            INSERT INTO learnings_fts(rowid, learning_id, pattern_type, description)
-            VALUES (new.rowid, new.learning_id, new.pattern_type, new.description);
-        END
+    conn.execute("DELETE FROM project_counters")
+    conn.execute("""
+        INSERT INTO project_counters (project_path, sessions, observations)
+        SELECT s.project_path, COUNT(*), COALESCE(SUM(o.observations), 0)
+        FROM sessions s
+        LEFT JOIN (
+            SELECT session_id, COUNT(*) AS observations FROM observations GROUP BY session_id
+        ) o ON o.session_id = s.session_id
+        GROUP BY s.project_path
     """)
-    
-    # Indexes for common queries
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_project ON sessions(project_path)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions(start_time DESC)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_observations_session ON observations(session_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_observations_tool ON observations(tool_name)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mutations_session ON mutations(session_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_session ON context_snapshots(session_id)")
-    
-    conn.commit()
-    conn.close()
+
+
+def _observation_row(session_id: str, tool_name: str, input_data: str, output_data: str,
+                     context_snapshot: str = "", execution_time_ms: int = 0,
+                     success: bool = True) -> tuple:
+    """Build an observation row for _insert_observations (new id, timestamp = now)."""
+    return (
+        str(uuid4()), session_id, tool_name, input_data, output_data,
+        context_snapshot, execution_time_ms, success, None
+    )
+
+
+def _import_row(record: dict, session_id: Optional[str] = None, timestamp: Optional[str] = None) -> tuple:
+    """Observation row for _insert_observations from a spooled / exported observation dict."""
+    return (
+        record.get("observation_id") or str(uuid4()),
+        session_id or record["session_id"],
+        record.get("tool_name", ""),
+        record.get("input_data", ""),
+        record.get("output_data", ""),
+        record.get("context_snapshot", ""),
+        record.get("execution_time_ms", 0),
+        record.get("success", True),
+        record.get("timestamp") or timestamp or _utc_timestamp()
+    )
+
+
+def _encode_blob(data: bytes, codec: str = "zlib") -> tuple:
+    """Compress a payload; returns (codec, data), falling back to raw if it doesn't shrink."""
+    packed = lzma.compress(data) if codec == "lzma" else zlib.compress(data)
+    return (codec, packed) if len(packed) < len(data) else ("raw", data)
+
+
+def _decode_bytes(codec: Optional[str], data: Optional[bytes]) -> bytes:
+    """Decompress one stored blob or chunk."""
+    if data is None:
+        return b""
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "lzma":
+        return lzma.decompress(data)
+    return data
+
+
+class BlobRef(tuple):
+    """A payload already stored in the blobs table (see store_observation_stream)."""
+
+    def __new__(cls, blob_id: str):
+        return super().__new__(cls, (blob_id,))
+
+    @property
+    def blob_id(self) -> str:
+        return self[0]
+
+
+def _payload_ref(value: Any, payloads: dict) -> tuple:
+    """(inline text, blob id) for a payload; new blob contents are collected in payloads."""
+    if isinstance(value, BlobRef):
+        return None, value.blob_id
+    if isinstance(value, (bytes, bytearray)):
+        # Small valid UTF-8 is inlined as text; anything else is kept byte-exact in a blob
+        data = bytes(value)
+        if len(data) <= INLINE_PAYLOAD_SIZE:
+            try:
+                return data.decode("utf-8"), None
+            except UnicodeDecodeError:
+                pass
+    else:
+        value = value or ""
+        if len(value) <= INLINE_PAYLOAD_SIZE:
+            return value, None
+        data = value.encode("utf-8")
+    blob_id = hashlib.sha256(data).hexdigest()
+    payloads.setdefault(blob_id, data)
+    return None, blob_id
+
+
+def _write_blobs(conn: sqlite3.Connection, payloads: dict) -> None:
+    """
+    Store blob contents not already present. Payloads above BLOB_CHUNK_SIZE
+    are split into independently compressed blob_chunks rows.
+    """
+    ids = list(payloads)
+    known = set()
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        known.update(r[0] for r in conn.execute(
+            f"SELECT blob_id FROM blobs WHERE blob_id IN ({','.join('?' * len(part))})", part))
+
+    blobs, chunks = [], []
+    for blob_id, data in payloads.items():
+        if blob_id in known:
+            continue
+        if len(data) <= BLOB_CHUNK_SIZE:
+            blobs.append((blob_id, *_encode_blob(data), len(data)))
+            continue
+        blobs.append((blob_id, "chunked", b"", len(data)))
+        for seq, offset in enumerate(range(0, len(data), BLOB_CHUNK_SIZE)):
+            chunks.append((blob_id, seq, *_encode_blob(data[offset:offset + BLOB_CHUNK_SIZE])))
+    conn.executemany("INSERT OR IGNORE INTO blobs (blob_id, codec, data, size) VALUES (?, ?, ?, ?)", blobs)
+    conn.executemany("INSERT OR IGNORE INTO blob_chunks (blob_id, seq, codec, data) VALUES (?, ?, ?, ?)", chunks)
+
+
+def _insert_observations(conn: sqlite3.Connection, rows: list) -> int:
+    """
+    Insert observation rows (see _observation_row) in the current transaction.
+
+    Payloads longer than INLINE_PAYLOAD_SIZE are moved to the blobs table,
+    keyed by SHA-256 so repeated outputs are stored (and compressed) once;
+    blob refcounts are kept by triggers. Returns the number of new rows.
+    """
+    if not conn.in_transaction:
+        # Hold the write lock across the existence check so a concurrent
+        # delete can't drop a blob between the check and the insert
+        conn.execute("BEGIN IMMEDIATE")
+
+    payloads = {}  # blob_id -> encoded bytes
+    stored = [row[:3] + _payload_ref(row[3], payloads) + _payload_ref(row[4], payloads) + row[5:]
+              for row in rows]
+    if payloads:
+        _write_blobs(conn, payloads)
+    return max(conn.executemany(_INSERT_OBSERVATION, stored).rowcount, 0)
+
+
+def _iter_source(source: Any, size: int) -> Iterator[bytes]:
+    """Bytes from a binary file object, a str, bytes, or an iterable of str/bytes, in size pieces."""
+    if hasattr(source, "read"):
+        while True:
+            piece = source.read(size)
+            if not piece:
+                return
+            yield piece.encode("utf-8") if isinstance(piece, str) else piece
+    if isinstance(source, (str, bytes)):
+        source = [source]
+    buffer = bytearray()
+    for piece in source:
+        buffer += piece.encode("utf-8") if isinstance(piece, str) else piece
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class Payload:
+    """
+    Lazy handle to an observation input/output payload.
+
+    Nothing is loaded until read() / str(); iter_bytes() and copy_to() stream
+    chunked blobs one chunk at a time, so memory stays flat for any size.
+    """
+
+    __slots__ = ("store", "blob_id", "size", "_inline")
+
+    def __init__(self, store: "MemoryStore", inline: Optional[str] = None,
+                 blob_id: Optional[str] = None, size: Optional[int] = None):
+        self.store = store
+        self.blob_id = blob_id
+        self._inline = inline or ""
+        self.size = size if blob_id else len(self._inline.encode("utf-8"))
+
+    def __len__(self) -> int:
+        return self.size or 0
+
+    def __str__(self) -> str:
+        return self.read()
+
+    def __repr__(self) -> str:
+        return f"<Payload {self.blob_id or 'inline'} {len(self)} bytes>"
+
+    def iter_bytes(self) -> Iterator[bytes]:
+        """Yield the payload's UTF-8 bytes, one stored chunk at a time."""
+        if self.blob_id is None:
+            if self._inline:
+                yield self._inline.encode("utf-8")
+            return
+        conn = self.store.conn
+        row = conn.execute("SELECT codec, data FROM blobs WHERE blob_id = ?", (self.blob_id,)).fetchone()
+        if row is None:
+            return
+        if row["codec"] != "chunked":
+            yield _decode_bytes(row["codec"], row["data"])
+            return
+        seq = 0
+        while True:
+            chunk = conn.execute("SELECT codec, data FROM blob_chunks WHERE blob_id = ? AND seq = ?",
+                                 (self.blob_id, seq)).fetchone()
+            if chunk is None:
+                return
+            yield _decode_bytes(chunk["codec"], chunk["data"])
+            seq += 1
+
+    def iter_text(self) -> Iterator[str]:
+        """Yield the payload as text pieces (multi-byte characters never split)."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        for piece in self.iter_bytes():
+            text = decoder.decode(piece)
+            if text:
+                yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def read(self) -> str:
+        """Materialize the whole payload as a string (invalid UTF-8 becomes U+FFFD)."""
+        if self.blob_id is None:
+            return self._inline
+        return b"".join(self.iter_bytes()).decode("utf-8", errors="replace")
+
+    def copy_to(self, fileobj) -> int:
+        """Stream the payload's bytes into a binary file object; returns bytes written."""
+        written = 0
+        for piece in self.iter_bytes():
+            fileobj.write(piece)
+            written += len(piece)
+        return written
+
+
+def _as_text(value: Any) -> str:
+    """Payload as text: strings as-is, text blocks joined, anything else as JSON."""
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).decode("utf-8", errors="replace")
+    if isinstance(value, list) and all(isinstance(v, dict) and "text" in v for v in value):
+        return "\n".join(str(v["text"]) for v in value)
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+def iter_transcript_observations(path: Path) -> Iterator[dict]:
+    """
+    Stream observation dicts from a JSONL file, one line at a time.
+
+    Accepts observation exports (lines with tool_name/input_data/output_data,
+    e.g. capture spool records) and agent transcripts, where tool_use content
+    blocks are paired with their tool_result by ID. Malformed lines are skipped.
+    """
+    pending = {}  # tool_use id -> observation waiting for its result
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(record, dict):
+                continue
+
+            if "tool_name" in record:
+                if record.get("type", "observation") == "observation":
+                    yield {**record,
+                           "input_data": _as_text(record.get("input_data")),
+                           "output_data": _as_text(record.get("output_data"))}
+                continue
+
+            message = record.get("message") if isinstance(record.get("message"), dict) else record
+            content = message.get("content")
+            if not isinstance(content, list):
+                continue
+            for block in content:
+                if not isinstance(block, dict):
+                    continue
+                if block.get("type") == "tool_use":
+                    pending[block.get("id")] = {
+                        "tool_name": block.get("name", ""),
+                        "input_data": _as_text(block.get("input")),
+                        "output_data": "",
+                        "timestamp": _transcript_timestamp(record.get("timestamp")),
+                    }
+                elif block.get("type") == "tool_result" and block.get("tool_use_id") in pending:
+                    observation = pending.pop(block["tool_use_id"])
+                    observation["output_data"] = _as_text(block.get("content"))
+                    observation["success"] = not block.get("is_error", False)
+                    yield observation
+    # Tool calls that never got a result
+    yield from pending.values()
+
+
+def _transcript_timestamp(value: Any) -> Optional[str]:
+    """ISO-8601 transcript timestamp in SQLite's UTC format (None if missing or invalid)."""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_spool_path(db_path: Optional[Path] = None) -> Path:
+    """Capture spool file that lives next to the database."""
+    return Path(db_path or DEFAULT_DB_PATH).parent / SPOOL_FILE
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in SQLite's CURRENT_TIMESTAMP format."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _valid_spool_record(record: Any) -> bool:
+    """Whether a spool line has the shape ingest needs (dict, known type, session_id)."""
+    return (isinstance(record, dict) and record.get("type") in ("session", "observation")
+            and isinstance(record.get("session_id"), str) and bool(record["session_id"]))
+
+
+def _ingest_rows(conn: sqlite3.Connection, sessions: list, observations: list) -> list:
+    """Insert spooled session and observation rows; returns [new sessions, new observations]."""
+    cursor = conn.executemany("""
+        INSERT OR IGNORE INTO sessions (session_id, project_path, task_description, start_time)
+        VALUES (?, ?, ?, ?)
+    """, sessions)
+    return [max(cursor.rowcount, 0), _insert_observations(conn, observations)]
+
+
+def append_to_spool(record: dict, db_path: Optional[Path] = None) -> None:
+    """
+    Append one JSON line to the capture spool without touching SQLite.
+
+    Uses a single O_APPEND write, so concurrent hook processes never
+    interleave lines; ingest() holds an exclusive lock only to truncate.
+    """
+    path = get_spool_path(db_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+class ObservationWriter:
+    """
+    Background thread that group-commits queued observations.
+
+    Rows are written with one executemany per transaction, flushed when
+    WRITER_BATCH_SIZE rows are pending, WRITER_FLUSH_INTERVAL seconds after
+    the oldest pending row, on flush() and on close(). submit() blocks while
+    the bounded queue is full.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store: "MemoryStore", batch_size: int = WRITER_BATCH_SIZE,
+                 flush_interval: float = WRITER_FLUSH_INTERVAL, max_queue: int = WRITER_QUEUE_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None  # Last write error, raised by the next flush()
+        self._thread = threading.Thread(target=self._run, name="memory-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, row: tuple, timeout: Optional[float] = None) -> None:
+        """
+        Queue an observations row; blocks while the queue is full (queue.Full on timeout).
+
+        Input/output payloads other than text, bytes or BlobRef (dicts, ...) are
+        converted with _as_text here, so a bad row can't fail later on the
+        writer thread.
+        """
+        if not self._thread.is_alive():
+            raise RuntimeError("observation writer is not running")
+        row = tuple(
+            value if i not in (3, 4) or isinstance(value, (BlobRef, bytes)) else _as_text(value)
+            for i, value in enumerate(row)
+        )
+        self.queue.put(row, timeout=timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every row queued so far is committed; re-raises a failed write."""
+        if not self._thread.is_alive():
+            raise RuntimeError("observation writer is not running")
+        done = threading.Event()
+        self.queue.put(done)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not done.wait(0.1):
+            if not self._thread.is_alive():
+                raise RuntimeError("observation writer stopped before flushing")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError("observation writer did not flush in time")
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def close(self) -> None:
+        """Commit pending rows and stop the writer thread."""
+        if self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            rows, waiters = [], []
+            item = self.queue.get()
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is self._STOP:
+                    stop = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                rows.append(item)
+                if len(rows) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            try:
+                if rows:
+                    self._write(rows)
+            finally:
+                for waiter in waiters:
+                    waiter.set()
+        self.store.close_thread_connection()
+
+    def _write(self, rows: list) -> None:
+        """Commit a batch; if it fails, retry row by row so only bad rows are dropped."""
+        try:
+            with self.store.conn as conn:
+                _insert_observations(conn, rows)
+            return
+        except Exception:
+            pass  # Retried below, one row per transaction
+        for row in rows:
+            try:
+                with self.store.conn as conn:
+                    _insert_observations(conn, [row])
+            except Exception as e:
+                self.error = e
+                print(f"⚠️ Observation writer dropped row {row[0]}: {e}", file=sys.stderr)
+
+
+class MemoryStore:
+    """
+    Memory database owning one long-lived, tuned connection per thread.
+
+    The module-level functions (create_session, store_observation, ...) are
+    thin wrappers around the shared store for their db_path (see get_store).
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self.db_path = Path(db_path or DEFAULT_DB_PATH)
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._writer = None
+        self._schema_lock = threading.RLock()
+        self._schema_checked = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use (migrating the schema once per store)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = _connect(self.db_path)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """Run init_schema if the database predates SCHEMA_VERSION (e.g. no blob columns yet)."""
+        if self._schema_checked:
+            return
+        with self._schema_lock:
+            if self._schema_checked:
+                return
+            # init_schema reuses this thread's connection (already in _local), so it won't recurse here;
+            # other threads wait on the lock until the migration has finished
+            if (_has_schema_object(conn, "table", "observations")
+                    and not _has_schema_object(conn, "trigger", "observations_ai")):
+                self._restore_observations_trigger()
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                self.init_schema()
+            self._schema_checked = True
+
+    def _restore_observations_trigger(self) -> None:
+        """Put back the FTS insert trigger a crashed defer_fts import left dropped, reindexing from scratch."""
+        with self.transaction() as conn:
+            if _has_schema_object(conn, "trigger", "observations_ai"):
+                return  # Restored by another process meanwhile
+            conn.execute(_OBSERVATIONS_AI_TRIGGER)
+            conn.execute("INSERT INTO observations_fts(observations_fts) VALUES ('rebuild')")
+
+    @property
+    def writer(self) -> ObservationWriter:
+        """Background observation writer, started on first use."""
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = ObservationWriter(self)
+        return self._writer
+
+    def flush(self) -> None:
+        """Wait until observations queued with queue_observation are committed."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close_thread_connection(self) -> None:
+        """Close the calling thread's connection (used by worker threads on exit)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Explicit write transaction (BEGIN IMMEDIATE ... COMMIT) on this thread's connection."""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def close(self) -> None:
+        """Commit queued observations and close every thread's connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._local = threading.local()
+        for conn in connections:
+            conn.close()
+
+    def init_schema(self) -> None:
+        """Create tables, FTS indexes, triggers and indexes if they don't exist."""
+        with self.conn as conn:
+            cursor = conn.cursor()
+
+            # Sessions table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    project_path TEXT NOT NULL,
+                    start_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    end_time TIMESTAMP,
+                    summary TEXT,
+                    token_usage INTEGER DEFAULT 0,
+                    success_score REAL DEFAULT 0.0,
+                    task_description TEXT,
+                    conversation_id TEXT
+                )
+            """)
+
+            # Observations table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS observations (
+                    observation_id TEXT PRIMARY KEY,
+                    session_id TEXT REFERENCES sessions(session_id),
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    tool_name TEXT,
+                    input_data TEXT,
+                    output_data TEXT,
+                    context_snapshot TEXT,
+                    execution_time_ms INTEGER,
+                    success BOOLEAN DEFAULT TRUE,
+                    input_blob TEXT REFERENCES blobs(blob_id),
+                    output_blob TEXT REFERENCES blobs(blob_id)
+                )
+            """)
+
+            # Databases created before payload blobs: add the reference columns
+            columns = {row["name"] for row in cursor.execute("PRAGMA table_info(observations)")}
+            for column in ("input_blob", "output_blob"):
+                if column not in columns:
+                    try:
+                        cursor.execute(f"ALTER TABLE observations ADD COLUMN {column} TEXT REFERENCES blobs(blob_id)")
+                    except sqlite3.OperationalError as e:
+                        if "duplicate column" not in str(e):  # Another process migrated first
+                            raise
+
+            # Content-addressed observation payloads (SHA-256 of the text)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    blob_id TEXT PRIMARY KEY,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    refcount INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    cold BOOLEAN DEFAULT FALSE
+                )
+            """)
+
+            # Mutations table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS mutations (
+                    mutation_id TEXT PRIMARY KEY,
+                    session_id TEXT REFERENCES sessions(session_id),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    inefficiency_type TEXT,
+                    mutation_strategy TEXT,
+                    confidence_score REAL,
+                    applied BOOLEAN DEFAULT FALSE,
+                    outcome TEXT,
+                    rollback_data TEXT
+                )
+            """)
+
+            # Learnings table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS learnings (
+                    learning_id TEXT PRIMARY KEY,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    pattern_type TEXT,
+                    description TEXT,
+                    frequency INTEGER DEFAULT 1,
+                    confidence_score REAL DEFAULT 0.5,
+                    cross_project_refs TEXT,
+                    source_sessions TEXT
+                )
+            """)
+
+            # Context snapshots table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS context_snapshots (
+                    snapshot_id TEXT PRIMARY KEY,
+                    session_id TEXT REFERENCES sessions(session_id),
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    compressed_context TEXT,
+                    retrieval_priority INTEGER DEFAULT 5,
+                    critical_facts TEXT
+                )
+            """)
+
+            # Hourly aggregates of observations past raw retention (see maintain)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS observation_rollups (
+                    hour TEXT NOT NULL,
+                    project_path TEXT NOT NULL DEFAULT '',
+                    tool_name TEXT NOT NULL DEFAULT '',
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    total_execution_ms INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (hour, project_path, tool_name)
+                )
+            """)
+
+            # Capture spool progress (see ingest)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS spool_offsets (
+                    spool_path TEXT PRIMARY KEY,
+                    byte_offset INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+            # FTS5 virtual table for semantic search on sessions
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
+                    session_id,
+                    summary,
+                    task_description,
+                    content='sessions',
+                    content_rowid='rowid'
+                )
+            """)
+
+            # FTS5 virtual table for observations
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5(
+                    observation_id,
+                    tool_name,
+                    context_snapshot,
+                    content='observations',
+                    content_rowid='rowid'
+                )
+            """)
+
+            # FTS5 virtual table for learnings
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS learnings_fts USING fts5(
+                    learning_id,
+                    pattern_type,
+                    description,
+                    content='learnings',
+                    content_rowid='rowid'
+                )
+            """)
+
+            # Triggers to keep FTS in sync
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS sessions_ai AFTER INSERT ON sessions BEGIN
+                    INSERT INTO sessions_fts(rowid, session_id, summary, task_description)
+                    VALUES (new.rowid, new.session_id, new.summary, new.task_description);
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS sessions_au AFTER UPDATE ON sessions BEGIN
+                    INSERT INTO sessions_fts(sessions_fts, rowid, session_id, summary, task_description)
+                    VALUES ('delete', old.rowid, old.session_id, old.summary, old.task_description);
+                    INSERT INTO sessions_fts(rowid, session_id, summary, task_description)
+                    VALUES (new.rowid, new.session_id, new.summary, new.task_description);
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS sessions_ad AFTER DELETE ON sessions BEGIN
+                    INSERT INTO sessions_fts(sessions_fts, rowid, session_id, summary, task_description)
+                    VALUES ('delete', old.rowid, old.session_id, old.summary, old.task_description);
+                END
+            """)
+
+            cursor.execute(_OBSERVATIONS_AI_TRIGGER)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS observations_au
+                AFTER UPDATE OF observation_id, tool_name, context_snapshot ON observations BEGIN
+                    INSERT INTO observations_fts(observations_fts, rowid, observation_id, tool_name, context_snapshot)
+                    VALUES ('delete', old.rowid, old.observation_id, old.tool_name, old.context_snapshot);
+                    INSERT INTO observations_fts(rowid, observation_id, tool_name, context_snapshot)
+                    VALUES (new.rowid, new.observation_id, new.tool_name, new.context_snapshot);
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS observations_ad AFTER DELETE ON observations BEGIN
+                    INSERT INTO observations_fts(observations_fts, rowid, observation_id, tool_name, context_snapshot)
+                    VALUES ('delete', old.rowid, old.observation_id, old.tool_name, old.context_snapshot);
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS learnings_ai AFTER INSERT ON learnings BEGIN
+                    INSERT INTO learnings_fts(rowid, learning_id, pattern_type, description)
+                    VALUES (new.rowid, new.learning_id, new.pattern_type, new.description);
+                END
+            """)
+
+            # Only indexed columns re-index (frequency/confidence bumps don't touch FTS)
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS learnings_au
+                AFTER UPDATE OF learning_id, pattern_type, description ON learnings BEGIN
+                    INSERT INTO learnings_fts(learnings_fts, rowid, learning_id, pattern_type, description)
+                    VALUES ('delete', old.rowid, old.learning_id, old.pattern_type, old.description);
+                    INSERT INTO learnings_fts(rowid, learning_id, pattern_type, description)
+                    VALUES (new.rowid, new.learning_id, new.pattern_type, new.description);
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS learnings_ad AFTER DELETE ON learnings BEGIN
+                    INSERT INTO learnings_fts(learnings_fts, rowid, learning_id, pattern_type, description)
+                    VALUES ('delete', old.rowid, old.learning_id, old.pattern_type, old.description);
+                END
+            """)
+
+            # Chunks of payloads larger than BLOB_CHUNK_SIZE (blobs.codec = 'chunked')
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS blob_chunks (
+                    blob_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    codec TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    PRIMARY KEY (blob_id, seq)
+                ) WITHOUT ROWID
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS blobs_ad AFTER DELETE ON blobs BEGIN
+                    DELETE FROM blob_chunks WHERE blob_id = old.blob_id;
+                END
+            """)
+
+            # Blob reference counts follow the observations that point at them
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS observations_blobs_ai AFTER INSERT ON observations BEGIN
+                    UPDATE blobs SET refcount = refcount + 1 WHERE blob_id = new.input_blob;
+                    UPDATE blobs SET refcount = refcount + 1 WHERE blob_id = new.output_blob;
+                END
+            """)
+
+            cursor.execute("""
+                CREATE TRIGGER IF NOT EXISTS observations_blobs_ad AFTER DELETE ON observations BEGIN
+                    UPDATE blobs SET refcount = refcount - 1 WHERE blob_id = old.input_blob;
+                    UPDATE blobs SET refcount = refcount - 1 WHERE blob_id = old.output_blob;
+                    DELETE FROM blobs WHERE blob_id IN (old.input_blob, old.output_blob) AND refcount <= 0;
+                END
+            """)
+
+            # Indexes for common queries
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_project ON sessions(project_path)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions(start_time DESC)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_observations_session ON observations(session_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_observations_tool ON observations(tool_name)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_observations_time ON observations(timestamp)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_mutations_session ON mutations(session_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_session ON context_snapshots(session_id)")
+
+            # Row counts kept by triggers so get_statistics never scans (see recount)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS counters (
+                    name TEXT PRIMARY KEY,
+                    value NUMERIC NOT NULL DEFAULT 0
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS project_counters (
+                    project_path TEXT PRIMARY KEY,
+                    sessions INTEGER NOT NULL DEFAULT 0,
+                    observations INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            for statement in _COUNTER_TRIGGERS:
+                cursor.execute(statement)
+
+        with self.transaction() as conn:
+            if not conn.execute("SELECT 1 FROM counters LIMIT 1").fetchone():
+                _recount(conn)  # New table on an existing database
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def create_session(self, project_path: str, task_description: str = "",
+                       conversation_id: str = "") -> str:
+        """Create a new session and return its ID."""
+        session_id = str(uuid4())
+        with self.conn as conn:
+            conn.execute("""
+                INSERT INTO sessions (session_id, project_path, task_description, conversation_id)
+                VALUES (?, ?, ?, ?)
+            """, (session_id, project_path, task_description, conversation_id))
+        return session_id
+
+    def load_context(self, project_path: str, task_description: str = "", limit: int = 5) -> dict[str, Any]:
+        """
+        Load relevant historical context for a project/task combination (see load_context).
+
+        One query: sessions (same project or FTS hit) and learnings (FTS hit or
+        confidence >= 0.8) are scored by bm25 relevance normalized to [0, 1)
+        plus a 0/1 project-match (or high-confidence) term, then weighted by
+        recency decay (TEMPORAL_DECAY_FACTOR per TEMPORAL_DECAY_DAYS) and
+        success/confidence. Deduplication and the cut happen in SQL: at most
+        limit sessions and limit learnings in total.
+        """
+        rows = self.conn.execute("""
+            WITH
+            session_hits AS (
+                -- bm25() is <= 0 (lower = better); -b / (1 - b) maps it onto [0, 1)
+                SELECT rowid, -bm25(sessions_fts) / (1 - bm25(sessions_fts)) AS relevance
+                FROM sessions_fts WHERE sessions_fts MATCH :match
+                ORDER BY rank LIMIT :pool
+            ),
+            session_candidates AS (
+                SELECT rowid, MAX(relevance) AS relevance FROM (
+                    SELECT rowid, relevance FROM session_hits
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT rowid, 0 FROM sessions WHERE project_path = :project
+                        ORDER BY start_time DESC LIMIT :pool
+                    )
+                )
+                GROUP BY rowid
+            ),
+            ranked_sessions AS (
+                SELECT json_object(
+                           'session_id', s.session_id, 'task_description', s.task_description,
+                           'summary', s.summary, 'start_time', s.start_time,
+                           'success_score', s.success_score
+                       ) AS item,
+                       ((s.project_path = :project) + c.relevance)
+                       * pow(:decay, MAX(julianday('now') - julianday(s.start_time), 0) / :period)
+                       * (0.5 + COALESCE(s.success_score, 0)) AS score
+                FROM session_candidates c
+                JOIN sessions s ON s.rowid = c.rowid
+                ORDER BY score DESC LIMIT :limit
+            ),
+            learning_hits AS (
+                SELECT rowid, -bm25(learnings_fts) / (1 - bm25(learnings_fts)) AS relevance
+                FROM learnings_fts WHERE learnings_fts MATCH :match
+                ORDER BY rank LIMIT :pool
+            ),
+            learning_candidates AS (
+                SELECT rowid, MAX(relevance) AS relevance FROM (
+                    SELECT rowid, relevance FROM learning_hits
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT rowid, 0 FROM learnings WHERE confidence_score >= 0.8
+                        ORDER BY frequency DESC, confidence_score DESC LIMIT :pool
+                    )
+                )
+                GROUP BY rowid
+            ),
+            ranked_learnings AS (
+                SELECT json_object(
+                           'learning_id', l.learning_id, 'pattern_type', l.pattern_type,
+                           'description', l.description, 'frequency', l.frequency,
+                           'confidence_score', l.confidence_score
+                       ) AS item,
+                       ((l.confidence_score >= 0.8) + c.relevance)
+                       * pow(:decay, MAX(julianday('now') - julianday(l.updated_at), 0) / :period)
+                       * COALESCE(l.confidence_score, 0.5) AS score
+                FROM learning_candidates c
+                JOIN learnings l ON l.rowid = c.rowid
+                ORDER BY score DESC, l.frequency DESC LIMIT :limit
+            ),
+            approaches AS (
+                SELECT json_quote(summary) AS item, MAX(success_score) AS score
+                FROM sessions
+                WHERE project_path = :project AND success_score >= 0.7 AND summary IS NOT NULL
+                GROUP BY summary
+                ORDER BY score DESC LIMIT 3
+            )
+            SELECT 'similar_sessions' AS kind, item, score FROM ranked_sessions
+            UNION ALL SELECT 'relevant_learnings', item, score FROM ranked_learnings
+            UNION ALL SELECT 'suggested_approaches', item, score FROM approaches
+            ORDER BY kind, score DESC
+        """, {
+            "match": _fts_match(task_description), "project": project_path, "limit": limit,
+            "pool": limit * CONTEXT_CANDIDATE_POOL,
+            "decay": TEMPORAL_DECAY_FACTOR, "period": TEMPORAL_DECAY_DAYS
+        }).fetchall()
+
+        result = {
+            "similar_sessions": [],
+            "relevant_learnings": [],
+            "suggested_approaches": [],
+            "context_injected": False
+        }
+        for row in rows:
+            item = json.loads(row["item"])
+            if isinstance(item, dict):
+                item["relevance"] = round(row["score"] or 0, 4)
+            result[row["kind"]].append(item)
+        result["context_injected"] = bool(result["similar_sessions"] or result["relevant_learnings"])
+        return result
+
+    def store_observation(self, session_id: str, tool_name: str, input_data: str, output_data: str,
+                          context_snapshot: str = "", execution_time_ms: int = 0,
+                          success: bool = True) -> str:
+        """Store a tool usage observation (committed before returning)."""
+        row = _observation_row(session_id, tool_name, input_data, output_data,
+                               context_snapshot, execution_time_ms, success)
+        with self.conn as conn:
+            _insert_observations(conn, [row])
+        return row[0]
+
+    def queue_observation(self, session_id: str, tool_name: str, input_data: str, output_data: str,
+                          context_snapshot: str = "", execution_time_ms: int = 0,
+                          success: bool = True) -> str:
+        """Queue an observation for the background writer; call flush() for durability."""
+        row = _observation_row(session_id, tool_name, input_data, output_data,
+                               context_snapshot, execution_time_ms, success)
+        self.writer.submit(row)
+        return row[0]
+
+    def ingest(self, spool_path: Optional[Path] = None, batch_size: int = INGEST_BATCH_SIZE) -> dict[str, int]:
+        """
+        Drain the capture spool into SQLite in large transactions.
+
+        The byte offset of the last ingested line is committed in the same
+        transaction as its rows, and rows are inserted with their spool IDs
+        (INSERT OR IGNORE), so every line lands exactly once even if ingest
+        is interrupted. A fully drained spool is truncated.
+        """
+        path = Path(spool_path or self.db_path.parent / SPOOL_FILE)
+        result = {"sessions": 0, "observations": 0, "skipped": 0, "bytes": 0}
+        if not path.exists():
+            return result
+
+        self.init_schema()
+        key = str(path.resolve())
+        conn = self.conn
+        row = conn.execute("SELECT byte_offset FROM spool_offsets WHERE spool_path = ?", (key,)).fetchone()
+        offset = row["byte_offset"] if row else 0
+        if offset > path.stat().st_size:
+            offset = 0  # Truncated after the offset was saved
+        ingested_at = _utc_timestamp()  # For records without their own timestamp
+
+        with open(path, "rb") as f:
+            f.seek(offset)
+            done = False
+            while not done:
+                sessions, observations = [], []
+                for _ in range(batch_size):
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        done = True  # EOF, or a line still being written
+                        break
+                    offset += len(line)
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        result["skipped"] += 1
+                        continue
+                    if not _valid_spool_record(record):
+                        result["skipped"] += 1
+                        continue
+                    if record["type"] == "session":
+                        sessions.append((
+                            record["session_id"], record.get("project_path", ""),
+                            record.get("task_description", ""), record.get("start_time") or ingested_at
+                        ))
+                    else:
+                        observations.append(_import_row(record, timestamp=ingested_at))
+                with self.transaction() as conn:
+                    try:
+                        conn.execute("SAVEPOINT ingest_batch")
+                        counts = _ingest_rows(conn, sessions, observations)
+                        conn.execute("RELEASE ingest_batch")
+                    except sqlite3.Error:
+                        # Some row can't be bound/inserted: retry one per savepoint, skipping bad rows
+                        conn.execute("ROLLBACK TO ingest_batch")
+                        conn.execute("RELEASE ingest_batch")
+                        counts = [0, 0]
+                        for one in [([r], []) for r in sessions] + [([], [r]) for r in observations]:
+                            conn.execute("SAVEPOINT ingest_row")
+                            try:
+                                added = _ingest_rows(conn, *one)
+                                conn.execute("RELEASE ingest_row")
+                            except sqlite3.Error:
+                                conn.execute("ROLLBACK TO ingest_row")
+                                conn.execute("RELEASE ingest_row")
+                                result["skipped"] += 1
+                                continue
+                            counts = [counts[0] + added[0], counts[1] + added[1]]
+                    result["sessions"] += counts[0]
+                    result["observations"] += counts[1]
+                    conn.execute("""
+                        INSERT INTO spool_offsets (spool_path, byte_offset) VALUES (?, ?)
+                        ON CONFLICT(spool_path) DO UPDATE SET byte_offset = excluded.byte_offset
+                    """, (key, offset))
+
+        result["bytes"] = offset
+        if fcntl is not None:
+            with open(path, "r+b") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                if os.fstat(f.fileno()).st_size == offset:
+                    # Reset the offset first: a crash before the truncate only
+                    # re-reads lines that INSERT OR IGNORE skips
+                    with conn:
+                        conn.execute("UPDATE spool_offsets SET byte_offset = 0 WHERE spool_path = ?", (key,))
+                    f.truncate(0)
+        return result
+
+    def import_observations(self, session_id: str, observations: Iterable[dict],
+                            defer_fts: bool = False, chunk_size: int = IMPORT_CHUNK_SIZE) -> int:
+        """
+        Bulk-insert observation dicts (see iter_transcript_observations) into a
+        session, chunk_size rows per transaction, consuming the iterable lazily.
+
+        With defer_fts the observations FTS insert trigger is dropped for the
+        import and every row added meanwhile is indexed in one statement at the
+        end. If the import dies midway, the next store opened on the database
+        recreates the trigger and rebuilds the observations index.
+        """
+        self.flush()
+        imported_at = _utc_timestamp()  # For rows without their own timestamp
+        rows = (_import_row(obs, session_id, imported_at) for obs in observations)
+
+        if defer_fts:
+            with self.transaction() as conn:
+                conn.execute("DROP TRIGGER IF EXISTS observations_ai")
+                # New rows (including other writers' while the trigger is off) get higher rowids
+                last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM observations").fetchone()[0]
+        imported = 0
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                with self.transaction() as conn:
+                    imported += _insert_observations(conn, chunk)
+        finally:
+            if defer_fts:
+                with self.transaction() as conn:
+                    if _has_schema_object(conn, "trigger", "observations_ai"):
+                        # Another store restored it (and rebuilt the index) while we ran
+                        conn.execute("INSERT INTO observations_fts(observations_fts) VALUES ('rebuild')")
+                    else:
+                        conn.execute(_OBSERVATIONS_AI_TRIGGER)
+                        conn.execute("""
+                            INSERT INTO observations_fts(rowid, observation_id, tool_name, context_snapshot)
+                            SELECT rowid, observation_id, tool_name, context_snapshot
+                            FROM observations WHERE rowid > ?
+                        """, (last_rowid,))
+        return imported
+
+    def fts(self, action: str, tables: Iterable[str] = FTS_TABLES) -> dict[str, str]:
+        """
+        Run an FTS5 maintenance command on each table.
+
+        Args:
+            action: rebuild (re-index from the content table), optimize (merge
+                all segments) or integrity-check (index vs content table)
+
+        Returns:
+            Dictionary of table -> "ok" or the integrity error message
+        """
+        if action not in ("rebuild", "optimize", "integrity-check"):
+            raise ValueError(f"Unknown FTS action: {action}")
+        self.flush()
+        result = {}
+        for table in tables:
+            if table not in FTS_TABLES:
+                raise ValueError(f"Unknown FTS table: {table}")
+            try:
+                with self.transaction() as conn:
+                    if action == "integrity-check":
+                        # rank = 1 also compares the index against the content table
+                        conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('integrity-check', 1)")
+                    else:
+                        conn.execute(f"INSERT INTO {table}({table}) VALUES (?)", (action,))
+                result[table] = "ok"
+            except sqlite3.DatabaseError as e:
+                if action != "integrity-check":
+                    raise
+                result[table] = str(e)
+        return result
+
+    def _database_bytes(self) -> int:
+        """Allocated database size (pages in use, excluding the free list)."""
+        conn = self.conn
+        pages = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return pages * conn.execute("PRAGMA page_size").fetchone()[0]
+
+    def _file_bytes(self) -> int:
+        """Database file size on disk (pages including the free list)."""
+        conn = self.conn
+        return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+    def maintain(self, policy: Optional[dict] = None, budget_seconds: Optional[float] = None,
+                 vacuum: bool = False) -> dict[str, Any]:
+        """
+        Apply the retention policy and compact the database.
+
+        Steps, in order: roll expired observations into observation_rollups and
+        delete them (MAINTAIN_BATCH_SIZE per transaction), drop expired rollups,
+        delete unreferenced blobs, recompress cold blobs, merge FTS segments
+        (full optimize without a budget) and return free pages to the OS with
+        incremental_vacuum. With budget_seconds it stops between batches when
+        the budget is spent; the next call resumes where it left off.
+        vacuum=True converts databases created before auto_vacuum with a full
+        VACUUM (blocking; never under a budget).
+
+        Returns:
+            Report dict with per-step counts, file bytes before/after,
+            reclaimed_bytes / grown_bytes (never negative) and complete
+            (False if the budget ran out)
+        """
+        policy = {**RETENTION_POLICY, **(policy or {})}
+        started = time.monotonic()
+        deadline = started + budget_seconds if budget_seconds is not None else None
+
+        def out_of_time() -> bool:
+            return deadline is not None and time.monotonic() >= deadline
+
+        self.flush()
+        self.init_schema()
+        report = {
+            "observations_rolled_up": 0, "rollups_deleted": 0, "blobs_deleted": 0,
+            "blobs_recompressed": 0, "fts": "skipped", "vacuumed_pages": 0,
+            "bytes_before": self._file_bytes()
+        }
+
+        # 1. Roll up and delete expired raw observations, oldest first
+        expired = f"""
+            SELECT rowid FROM observations
+            WHERE timestamp < datetime('now', '-{int(policy["raw_days"])} days')
+            ORDER BY timestamp, rowid LIMIT {int(MAINTAIN_BATCH_SIZE)}
+        """
+        while not out_of_time():
+            with self.transaction() as conn:
+                conn.execute(f"""
+                    INSERT INTO observation_rollups (hour, project_path, tool_name, calls, failures, total_execution_ms)
+                    SELECT strftime('%Y-%m-%d %H:00:00', o.timestamp), COALESCE(s.project_path, ''),
+                           COALESCE(o.tool_name, ''), COUNT(*), COALESCE(SUM(NOT o.success), 0),
+                           COALESCE(SUM(o.execution_time_ms), 0)
+                    FROM observations o
+                    LEFT JOIN sessions s ON s.session_id = o.session_id
+                    WHERE o.rowid IN ({expired})
+                    GROUP BY 1, 2, 3
+                    ON CONFLICT (hour, project_path, tool_name) DO UPDATE SET
+                        calls = calls + excluded.calls,
+                        failures = failures + excluded.failures,
+                        total_execution_ms = total_execution_ms + excluded.total_execution_ms
+                """)
+                deleted = conn.execute(f"DELETE FROM observations WHERE rowid IN ({expired})").rowcount
+            report["observations_rolled_up"] += deleted
+            if deleted < MAINTAIN_BATCH_SIZE:
+                break
+
+        # 2. Expired rollups, 3. blobs no observation references any more
+        if not out_of_time():
+            with self.transaction() as conn:
+                report["rollups_deleted"] = conn.execute(
+                    "DELETE FROM observation_rollups WHERE hour < datetime('now', ?)",
+                    (f"-{int(policy['rollup_days'])} days",)
+                ).rowcount
+                report["blobs_deleted"] = conn.execute("DELETE FROM blobs WHERE refcount <= 0").rowcount
+
+        # 4. Cold blobs to lzma
+        while not out_of_time():
+            recompressed = self.recompress_blobs(limit=100)
+            report["blobs_recompressed"] += recompressed["blobs"]
+            if not self.conn.execute(
+                    "SELECT 1 FROM blobs WHERE NOT cold AND codec = 'zlib' AND created_at < datetime('now', ?) LIMIT 1",
+                    (f"-{COLD_BLOB_DAYS} days",)).fetchone():
+                break
+
+        # 5. FTS segments: bounded merge under a budget, full optimize otherwise
+        if not out_of_time():
+            with self.transaction() as conn:
+                for table in FTS_TABLES:
+                    if budget_seconds is None:
+                        conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+                    else:
+                        conn.execute(f"INSERT INTO {table}({table}, rank) VALUES ('merge', 200)")
+            report["fts"] = "optimize" if budget_seconds is None else "merge"
+
+        # 6. Give free pages back to the OS
+        conn = self.conn
+        if vacuum and budget_seconds is None and conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.flush()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")  # Rewrites the file once; later runs use incremental_vacuum
+        while not out_of_time() and conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if not free:
+                break
+            # executescript runs the pragma to completion (execute() frees one page per step)
+            conn.executescript(f"PRAGMA incremental_vacuum({MAINTAIN_VACUUM_PAGES})")
+            report["vacuumed_pages"] += free - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+        report["bytes_after"] = self._file_bytes()
+        # The file can grow (WAL, rollup rows, FTS merges); report that apart from what was freed
+        change = report["bytes_before"] - report["bytes_after"]
+        report["reclaimed_bytes"] = max(change, 0)
+        report["grown_bytes"] = max(-change, 0)
+        report["free_bytes"] = report["bytes_after"] - self._database_bytes()
+        report["complete"] = not out_of_time()
+        report["seconds"] = round(time.monotonic() - started, 3)
+        return report
+
+    def compress_session(self, session_id: str, summary: str, success_score: float = 0.5,
+                         token_usage: int = 0) -> None:
+        """Finalize a session with its summary, score and token usage."""
+        with self.conn as conn:
+            conn.execute("""
+                UPDATE sessions
+                SET end_time = CURRENT_TIMESTAMP,
+                    summary = ?,
+                    success_score = ?,
+                    token_usage = ?
+                WHERE session_id = ?
+            """, (summary, success_score, token_usage, session_id))
+
+    def query_similar_sessions(self, query_text: str, limit: int = 5) -> list[dict[str, Any]]:
+        """Query for sessions similar to the given text using FTS5."""
+        # Clean query for FTS5
+        clean_query = " ".join(query_text.split())
+
+        cursor = self.conn.execute("""
+            SELECT s.session_id, s.project_path, s.task_description, s.summary,
+                   s.start_time, s.success_score, s.token_usage
+            FROM sessions s
+            WHERE s.session_id IN (
+                SELECT session_id FROM sessions_fts
+                WHERE sessions_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            )
+            ORDER BY s.start_time DESC
+        """, (clean_query, limit))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_session_observations(self, session_id: str, lazy: bool = True) -> list[dict[str, Any]]:
+        """
+        Get all observations for a session (including queued ones).
+
+        input_data / output_data are Payload handles that load nothing until
+        read; lazy=False materializes them as strings.
+        """
+        self.flush()
+        cursor = self.conn.execute("""
+            SELECT o.observation_id, o.timestamp, o.tool_name, o.input_data, o.output_data,
+                   o.context_snapshot, o.execution_time_ms, o.success,
+                   o.input_blob, ib.size AS input_size, o.output_blob, ob.size AS output_size
+            FROM observations o
+            LEFT JOIN blobs ib ON ib.blob_id = o.input_blob
+            LEFT JOIN blobs ob ON ob.blob_id = o.output_blob
+            WHERE o.session_id = ?
+            ORDER BY o.timestamp ASC
+        """, (session_id,))
+
+        results = []
+        for row in cursor.fetchall():
+            observation = {key: row[key] for key in (
+                "observation_id", "timestamp", "tool_name", "context_snapshot", "execution_time_ms", "success"
+            )}
+            for field in ("input", "output"):
+                payload = Payload(self, row[f"{field}_data"], row[f"{field}_blob"], row[f"{field}_size"])
+                observation[f"{field}_data"] = payload if lazy else payload.read()
+            results.append(observation)
+        return results
+
+    def store_observation_stream(self, session_id: str, tool_name: str, input_data: str, output: Any,
+                                 context_snapshot: str = "", execution_time_ms: int = 0,
+                                 success: bool = True) -> str:
+        """
+        Store an observation whose output is streamed from a binary file object
+        (or an iterable of str/bytes) in BLOB_CHUNK_SIZE chunks, hashing as it
+        goes, so memory stays flat for any output size.
+        """
+        temp_id = f"tmp-{uuid4()}"
+        digest = hashlib.sha256()
+        size = 0
+        with self.transaction() as conn:
+            for seq, chunk in enumerate(_iter_source(output, BLOB_CHUNK_SIZE)):
+                digest.update(chunk)
+                size += len(chunk)
+                conn.execute("INSERT INTO blob_chunks (blob_id, seq, codec, data) VALUES (?, ?, ?, ?)",
+                             (temp_id, seq, *_encode_blob(chunk)))
+            blob_id = digest.hexdigest()
+            if conn.execute("SELECT 1 FROM blobs WHERE blob_id = ?", (blob_id,)).fetchone():
+                conn.execute("DELETE FROM blob_chunks WHERE blob_id = ?", (temp_id,))  # Already stored
+            else:
+                conn.execute("INSERT INTO blobs (blob_id, codec, data, size) VALUES (?, 'chunked', x'', ?)",
+                             (blob_id, size))
+                conn.execute("UPDATE blob_chunks SET blob_id = ? WHERE blob_id = ?", (blob_id, temp_id))
+            row = _observation_row(session_id, tool_name, input_data, BlobRef(blob_id),
+                                   context_snapshot, execution_time_ms, success)
+            _insert_observations(conn, [row])
+        return row[0]
+
+    def recompress_blobs(self, older_than_days: int = COLD_BLOB_DAYS, limit: int = 1000) -> dict[str, int]:
+        """
+        Re-encode up to limit cold zlib blobs with lzma (kept only where smaller)
+        and mark them cold so they aren't revisited.
+
+        Returns:
+            Dictionary with blobs (re-encoded count) and bytes_saved
+        """
+        result = {"blobs": 0, "bytes_saved": 0}
+        with self.transaction() as conn:
+            rows = conn.execute("""
+                SELECT blob_id, codec, data FROM blobs
+                WHERE NOT cold AND codec = 'zlib' AND created_at < datetime('now', ?)
+                LIMIT ?
+            """, (f"-{older_than_days} days", limit)).fetchall()
+            for row in rows:
+                codec, data = _encode_blob(_decode_bytes(row["codec"], row["data"]), "lzma")
+                if codec == "lzma" and len(data) < len(row["data"]):
+                    conn.execute("UPDATE blobs SET codec = ?, data = ?, cold = TRUE WHERE blob_id = ?",
+                                 (codec, data, row["blob_id"]))
+                    result["blobs"] += 1
+                    result["bytes_saved"] += len(row["data"]) - len(data)
+                else:
+                    conn.execute("UPDATE blobs SET cold = TRUE WHERE blob_id = ?", (row["blob_id"],))
+        return result
+
+    def store_learning(self, pattern_type: str, description: str, source_sessions: list[str],
+                       confidence_score: float = 0.5, cross_project_refs: list[str] = None) -> str:
+        """Store a new learning pattern."""
+        learning_id = str(uuid4())
+        with self.conn as conn:
+            conn.execute("""
+                INSERT INTO learnings (
+                    learning_id, pattern_type, description, confidence_score,
+                    cross_project_refs, source_sessions
+                )
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (
+                learning_id,
+                pattern_type,
+                description,
+                confidence_score,
+                json.dumps(cross_project_refs or []),
+                json.dumps(source_sessions)
+            ))
+        return learning_id
+
+    def update_learning_frequency(self, learning_id: str, increment: int = 1) -> None:
+        """Increment the frequency of a learning pattern."""
+        with self.conn as conn:
+            conn.execute("""
+                UPDATE learnings
+                SET frequency = frequency + ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE learning_id = ?
+            """, (increment, learning_id))
+
+    def get_statistics(self) -> dict[str, Any]:
+        """Get database statistics (trigger-maintained counters; no table scans)."""
+        self.flush()
+        counters = {row["name"]: row["value"] for row in self.conn.execute("SELECT name, value FROM counters")}
+        scored = counters.get("scored_sessions", 0)
+        return {
+            "total_sessions": int(counters.get("sessions", 0)),
+            "total_observations": int(counters.get("observations", 0)),
+            "total_mutations": int(counters.get("mutations", 0)),
+            "total_learnings": int(counters.get("learnings", 0)),
+            "unique_projects": int(counters.get("projects", 0)),
+            "avg_success_score": round(counters.get("success_score_sum", 0) / scored, 2) if scored else 0
+        }
+
+    def get_project_statistics(self, project_path: str) -> dict[str, int]:
+        """Session and observation counts for one project."""
+        self.flush()
+        row = self.conn.execute(
+            "SELECT sessions, observations FROM project_counters WHERE project_path = ?", (project_path,)
+        ).fetchone()
+        return dict(row) if row else {"sessions": 0, "observations": 0}
+
+    def recount(self) -> dict[str, tuple]:
+        """
+        Rebuild the counters from the tables, repairing any drift.
+
+        Returns:
+            Dictionary of counter name -> (old value, new value) for counters that changed
+        """
+        self.flush()
+        with self.transaction() as conn:
+            before = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+            _recount(conn)
+            after = {row["name"]: row["value"] for row in conn.execute("SELECT name, value FROM counters")}
+        return {
+            name: (before.get(name), value) for name, value in after.items()
+            if before.get(name) is None or abs(before[name] - value) > 1e-9
+        }
+
+
+_stores: dict[str, MemoryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: Optional[Path] = None) -> MemoryStore:
+    """Return the shared MemoryStore for a database path (default: project memory.db)."""
+    key = os.path.abspath(db_path or DEFAULT_DB_PATH)
+    store = _stores.get(key)
+    if store is None:
+        with _stores_lock:
+            store = _stores.setdefault(key, MemoryStore(Path(key)))
+    return store
+
+
+@atexit.register
+def close_stores() -> None:
+    """Close all shared stores (also runs at interpreter exit)."""
+    with _stores_lock:
+        stores = list(_stores.values())
+        _stores.clear()
+    for store in stores:
+        store.close()
+
+
+def init_database(db_path: Optional[Path] = None) -> None:
+    """Initialize the database schema if it doesn't exist."""
+    get_store(db_path).init_schema()
     print(f"✅ Database initialized at {db_path or DEFAULT_DB_PATH}")
 
 
@@ -238,18 +1769,7 @@ def create_session(
     db_path: Optional[Path] = None
 ) -> str:
     """Create a new session and return its ID."""
-    session_id = str(uuid4())
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO sessions (session_id, project_path, task_description, conversation_id)
-        VALUES (?, ?, ?, ?)
-    """, (session_id, project_path, task_description, conversation_id))
-    
-    conn.commit()
-    conn.close()
-    return session_id
+    return get_store(db_path).create_session(project_path, task_description, conversation_id)
 
 
 def load_context(
@@ -263,98 +1783,12 @@ def load_context(
     
     Returns:
         Dictionary with:
-        - similar_sessions: List of relevant past sessions
-        - relevant_learnings: Applicable patterns and lessons
+        - similar_sessions: Up to limit relevant past sessions, best first
+        - relevant_learnings: Up to limit applicable patterns and lessons, best first
         - suggested_approaches: Proven strategies from history
+        Sessions and learnings carry their ranking score as "relevance".
     """
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    result = {
-        "similar_sessions": [],
-        "relevant_learnings": [],
-        "suggested_approaches": [],
-        "context_injected": False
-    }
-    
-    # Find sessions from the same project
-    cursor.execute("""
-        SELECT session_id, task_description, summary, start_time, success_score
-        FROM sessions
-        WHERE project_path = ?
-        ORDER BY start_time DESC
-        LIMIT ?
-    """, (project_path, limit))
-    
-    project_sessions = [dict(row) for row in cursor.fetchall()]
-    result["similar_sessions"].extend(project_sessions)
-    
-    # If task description provided, search for semantically similar sessions
-    if task_description:
-        cursor.execute("""
-            SELECT session_id, task_description, summary, start_time, success_score
-            FROM sessions
-            WHERE session_id IN (
-                SELECT session_id FROM sessions_fts
-                WHERE sessions_fts MATCH ?
-                ORDER BY rank
-                LIMIT ?
-            )
-        """, (task_description, limit))
-        
-        semantic_sessions = [dict(row) for row in cursor.fetchall()]
-        
-        # Merge and deduplicate
-        seen_ids = {s["session_id"] for s in result["similar_sessions"]}
-        for session in semantic_sessions:
-            if session["session_id"] not in seen_ids:
-                result["similar_sessions"].append(session)
-    
-    # Load relevant learnings
-    if task_description:
-        cursor.execute("""
-            SELECT learning_id, pattern_type, description, frequency, confidence_score
-            FROM learnings
-            WHERE learning_id IN (
-                SELECT learning_id FROM learnings_fts
-                WHERE learnings_fts MATCH ?
-                ORDER BY rank
-                LIMIT ?
-            )
-            ORDER BY confidence_score DESC, frequency DESC
-        """, (task_description, limit))
-        
-        result["relevant_learnings"] = [dict(row) for row in cursor.fetchall()]
-    
-    # Load high-confidence learnings regardless of task
-    cursor.execute("""
-        SELECT learning_id, pattern_type, description, frequency, confidence_score
-        FROM learnings
-        WHERE confidence_score >= 0.8
-        ORDER BY frequency DESC, confidence_score DESC
-        LIMIT ?
-    """, (limit,))
-    
-    high_confidence = [dict(row) for row in cursor.fetchall()]
-    seen_learning_ids = {l["learning_id"] for l in result["relevant_learnings"]}
-    for learning in high_confidence:
-        if learning["learning_id"] not in seen_learning_ids:
-            result["relevant_learnings"].append(learning)
-    
-    # Generate suggested approaches from successful sessions
-    cursor.execute("""
-        SELECT DISTINCT summary
-        FROM sessions
-        WHERE project_path = ? AND success_score >= 0.7 AND summary IS NOT NULL
-        ORDER BY success_score DESC
-        LIMIT 3
-    """, (project_path,))
-    
-    result["suggested_approaches"] = [row["summary"] for row in cursor.fetchall()]
-    result["context_injected"] = bool(result["similar_sessions"] or result["relevant_learnings"])
-    
-    conn.close()
-    return result
+    return get_store(db_path).load_context(project_path, task_description, limit)
 
 
 def store_observation(
@@ -368,29 +1802,108 @@ def store_observation(
     db_path: Optional[Path] = None
 ) -> str:
     """Store a tool usage observation."""
-    observation_id = str(uuid4())
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    # Truncate large data to prevent database bloat
-    max_data_size = 10000  # 10KB per field
-    input_truncated = input_data[:max_data_size] if len(input_data) > max_data_size else input_data
-    output_truncated = output_data[:max_data_size] if len(output_data) > max_data_size else output_data
-    
-    cursor.execute("""
-        INSERT INTO observations (
-            observation_id, session_id, tool_name, input_data, output_data,
-            context_snapshot, execution_time_ms, success
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        observation_id, session_id, tool_name, input_truncated, output_truncated,
+    return get_store(db_path).store_observation(
+        session_id, tool_name, input_data, output_data,
         context_snapshot, execution_time_ms, success
-    ))
-    
-    conn.commit()
-    conn.close()
-    return observation_id
+    )
+
+
+def store_observation_stream(
+    session_id: str,
+    tool_name: str,
+    input_data: str,
+    output: Any,
+    context_snapshot: str = "",
+    execution_time_ms: int = 0,
+    success: bool = True,
+    db_path: Optional[Path] = None
+) -> str:
+    """Store an observation whose (large) output is streamed from a file object or iterable."""
+    return get_store(db_path).store_observation_stream(
+        session_id, tool_name, input_data, output,
+        context_snapshot, execution_time_ms, success
+    )
+
+
+def queue_observation(
+    session_id: str,
+    tool_name: str,
+    input_data: str,
+    output_data: str,
+    context_snapshot: str = "",
+    execution_time_ms: int = 0,
+    success: bool = True,
+    db_path: Optional[Path] = None
+) -> str:
+    """
+    Queue a tool usage observation for batched, asynchronous storage.
+
+    Returns the observation ID immediately; rows are group-committed by a
+    background writer. Use flush_observations() when they must be durable.
+    """
+    return get_store(db_path).queue_observation(
+        session_id, tool_name, input_data, output_data,
+        context_snapshot, execution_time_ms, success
+    )
+
+
+def ingest_spool(db_path: Optional[Path] = None) -> dict[str, int]:
+    """Drain the capture spool next to the database into it (see MemoryStore.ingest)."""
+    return get_store(db_path).ingest(get_spool_path(db_path))
+
+
+def import_transcript(
+    transcript: Path,
+    session_id: Optional[str] = None,
+    project_path: Optional[str] = None,
+    task_description: str = "",
+    defer_fts: bool = False,
+    db_path: Optional[Path] = None
+) -> dict[str, Any]:
+    """
+    Bulk-import a JSONL transcript or observation export.
+
+    Observations go into session_id, or into a new session for project_path
+    (default: current project) when none is given.
+
+    Returns:
+        Dictionary with session_id, observations (rows imported) and seconds
+    """
+    store = get_store(db_path)
+    store.init_schema()
+    started = time.perf_counter()
+    if not session_id:
+        session_id = store.create_session(
+            project_path or str(get_project_root()),
+            task_description or f"Imported: {Path(transcript).name}"
+        )
+    count = store.import_observations(session_id, iter_transcript_observations(transcript), defer_fts)
+    return {
+        "session_id": session_id,
+        "observations": count,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def run_maintenance(
+    budget_seconds: Optional[float] = None,
+    vacuum: bool = False,
+    policy: Optional[dict] = None,
+    db_path: Optional[Path] = None
+) -> dict[str, Any]:
+    """Apply retention and compaction (see MemoryStore.maintain); resumable under a time budget."""
+    return get_store(db_path).maintain(policy, budget_seconds, vacuum)
+
+
+def fts_maintenance(action: str, tables: Optional[Iterable[str]] = None,
+                    db_path: Optional[Path] = None) -> dict[str, str]:
+    """Rebuild, optimize or integrity-check the FTS5 indexes (see MemoryStore.fts)."""
+    return get_store(db_path).fts(action, tables or FTS_TABLES)
+
+
+def flush_observations(db_path: Optional[Path] = None) -> None:
+    """Block until queued observations are committed."""
+    get_store(db_path).flush()
 
 
 def compress_session(
@@ -409,20 +1922,7 @@ def compress_session(
         success_score: 0.0-1.0 score of session success
         token_usage: Approximate token count used
     """
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        UPDATE sessions
-        SET end_time = CURRENT_TIMESTAMP,
-            summary = ?,
-            success_score = ?,
-            token_usage = ?
-        WHERE session_id = ?
-    """, (summary, success_score, token_usage, session_id))
-    
-    conn.commit()
-    conn.close()
+    get_store(db_path).compress_session(session_id, summary, success_score, token_usage)
     print(f"✅ Session {session_id[:8]}... compressed")
 
 
@@ -441,49 +1941,16 @@ def query_similar_sessions(
     Returns:
         List of matching sessions with relevance info
     """
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    # Clean query for FTS5
-    clean_query = " ".join(query_text.split())
-    
-    cursor.execute("""
-        SELECT s.session_id, s.project_path, s.task_description, s.summary,
-               s.start_time, s.success_score, s.token_usage
-        FROM sessions s
-        WHERE s.session_id IN (
-            SELECT session_id FROM sessions_fts
-            WHERE sessions_fts MATCH ?
-            ORDER BY rank
-            LIMIT ?
-        )
-        ORDER BY s.start_time DESC
-    """, (clean_query, limit))
-    
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+    return get_store(db_path).query_similar_sessions(query_text, limit)
 
 
 def get_session_observations(
     session_id: str,
-    db_path: Optional[Path] = None
+    db_path: Optional[Path] = None,
+    lazy: bool = True
 ) -> list[dict[str, Any]]:
-    """Get all observations for a session."""
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT observation_id, timestamp, tool_name, input_data, output_data,
-               context_snapshot, execution_time_ms, success
-        FROM observations
-        WHERE session_id = ?
-        ORDER BY timestamp ASC
-    """, (session_id,))
-    
-    results = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return results
+    """Get all observations for a session (payloads as lazy Payload handles unless lazy=False)."""
+    return get_store(db_path).get_session_observations(session_id, lazy)
 
 
 def store_learning(
@@ -495,28 +1962,9 @@ def store_learning(
     db_path: Optional[Path] = None
 ) -> str:
     """Store a new learning pattern."""
-    learning_id = str(uuid4())
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        INSERT INTO learnings (
-            learning_id, pattern_type, description, confidence_score,
-            cross_project_refs, source_sessions
-        )
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (
-        learning_id,
-        pattern_type,
-        description,
-        confidence_score,
-        json.dumps(cross_project_refs or []),
-        json.dumps(source_sessions)
-    ))
-    
-    conn.commit()
-    conn.close()
-    return learning_id
+    return get_store(db_path).store_learning(
+        pattern_type, description, source_sessions, confidence_score, cross_project_refs
+    )
 
 
 def update_learning_frequency(
@@ -525,48 +1973,22 @@ def update_learning_frequency(
     db_path: Optional[Path] = None
 ) -> None:
     """Increment the frequency of a learning pattern."""
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        UPDATE learnings
-        SET frequency = frequency + ?,
-            updated_at = CURRENT_TIMESTAMP
-        WHERE learning_id = ?
-    """, (increment, learning_id))
-    
-    conn.commit()
-    conn.close()
+    get_store(db_path).update_learning_frequency(learning_id, increment)
 
 
 def get_statistics(db_path: Optional[Path] = None) -> dict[str, Any]:
     """Get database statistics."""
-    conn = get_db_connection(db_path)
-    cursor = conn.cursor()
-    
-    stats = {}
-    
-    cursor.execute("SELECT COUNT(*) as count FROM sessions")
-    stats["total_sessions"] = cursor.fetchone()["count"]
-    
-    cursor.execute("SELECT COUNT(*) as count FROM observations")
-    stats["total_observations"] = cursor.fetchone()["count"]
-    
-    cursor.execute("SELECT COUNT(*) as count FROM mutations")
-    stats["total_mutations"] = cursor.fetchone()["count"]
-    
-    cursor.execute("SELECT COUNT(*) as count FROM learnings")
-    stats["total_learnings"] = cursor.fetchone()["count"]
-    
-    cursor.execute("SELECT COUNT(DISTINCT project_path) as count FROM sessions")
-    stats["unique_projects"] = cursor.fetchone()["count"]
-    
-    cursor.execute("SELECT AVG(success_score) as avg FROM sessions WHERE success_score > 0")
-    row = cursor.fetchone()
-    stats["avg_success_score"] = round(row["avg"], 2) if row["avg"] else 0
-    
-    conn.close()
-    return stats
+    return get_store(db_path).get_statistics()
+
+
+def get_project_statistics(project_path: str, db_path: Optional[Path] = None) -> dict[str, int]:
+    """Session and observation counts for one project."""
+    return get_store(db_path).get_project_statistics(project_path)
+
+
+def recount_statistics(db_path: Optional[Path] = None) -> dict[str, tuple]:
+    """Rebuild the statistics counters from the tables; returns the counters that drifted."""
+    return get_store(db_path).recount()
 
 
 def main():
@@ -589,7 +2011,9 @@ def main():
     store_parser.add_argument("--session-id", required=True, help="Session ID")
     store_parser.add_argument("--tool", required=True, help="Tool name")
     store_parser.add_argument("--input", required=True, help="Input data")
-    store_parser.add_argument("--output", required=True, help="Output data")
+    store_output = store_parser.add_mutually_exclusive_group(required=True)
+    store_output.add_argument("--output", help="Output data")
+    store_output.add_argument("--output-file", type=Path, help="Stream output data from a file (no size limit)")
     store_parser.add_argument("--context", default="", help="Context snapshot")
     store_parser.add_argument("--db-path", type=Path, help="Database path")
     
@@ -599,8 +2023,19 @@ def main():
     compress_parser.add_argument("--summary", required=True, help="Session summary")
     compress_parser.add_argument("--score", type=float, default=0.5, help="Success score 0-1")
     compress_parser.add_argument("--tokens", type=int, default=0, help="Token usage")
+    compress_parser.add_argument("--transcript", type=Path, help="JSONL transcript to import into the session first")
     compress_parser.add_argument("--db-path", type=Path, help="Database path")
     
+    # Import command (bulk-load a transcript / observation export)
+    import_parser = subparsers.add_parser("import", help="Bulk-import a JSONL transcript or observation export")
+    import_parser.add_argument("file", type=Path, help="JSONL file")
+    import_parser.add_argument("--session-id", help="Existing session to import into (default: new session)")
+    import_parser.add_argument("--project", help="Project path for a new session (default: current project)")
+    import_parser.add_argument("--task", default="", help="Task description for a new session")
+    import_parser.add_argument("--defer-fts", action="store_true",
+                               help="Skip per-row FTS updates and rebuild the index once at the end")
+    import_parser.add_argument("--db-path", type=Path, help="Database path")
+    
     # Query command
     query_parser = subparsers.add_parser("query", help="Query similar sessions")
     query_parser.add_argument("--text", required=True, help="Query text")
@@ -609,6 +2044,8 @@ def main():
     
     # Stats command
     stats_parser = subparsers.add_parser("stats", help="Show database statistics")
+    stats_parser.add_argument("--recount", action="store_true", help="Rebuild counters from the tables first")
+    stats_parser.add_argument("--project", help="Also show counts for this project path")
     stats_parser.add_argument("--db-path", type=Path, help="Database path")
     
     # === SIMPLIFIED COMMANDS ===
@@ -628,6 +2065,30 @@ def main():
     capture_parser = subparsers.add_parser("capture", help="Quick capture observation")
     capture_parser.add_argument("description", help="What happened (e.g., 'fixed auth bug in login.tsx')")
     capture_parser.add_argument("--tool", "-t", default="agent_action", help="Tool/action name")
+    capture_parser.add_argument("--sync", action="store_true",
+                                help="Write to SQLite now instead of appending to the capture spool")
+
+    # Maintain command (retention, rollups, compaction)
+    maintain_parser = subparsers.add_parser("maintain", help="Apply retention policy and compact the database")
+    maintain_parser.add_argument("--raw-days", type=int, default=RETENTION_POLICY["raw_days"],
+                                 help="Days to keep raw observations before rolling them up")
+    maintain_parser.add_argument("--rollup-days", type=int, default=RETENTION_POLICY["rollup_days"],
+                                 help="Days to keep hourly rollups")
+    maintain_parser.add_argument("--budget", type=float, help="Stop after this many seconds (resume next run)")
+    maintain_parser.add_argument("--vacuum", action="store_true",
+                                 help="One-off full VACUUM to enable incremental vacuum on older databases")
+    maintain_parser.add_argument("--db-path", type=Path, help="Database path")
+    
+    # FTS command (index maintenance)
+    fts_parser = subparsers.add_parser("fts", help="FTS5 index maintenance")
+    fts_parser.add_argument("action", choices=["rebuild", "optimize", "integrity-check"])
+    fts_parser.add_argument("--table", action="append", choices=list(FTS_TABLES),
+                            help="Limit to this FTS table (repeatable; default: all)")
+    fts_parser.add_argument("--db-path", type=Path, help="Database path")
+    
+    # Ingest command (drain the capture spool)
+    ingest_parser = subparsers.add_parser("ingest", help="Ingest spooled captures into the database")
+    ingest_parser.add_argument("--db-path", type=Path, help="Database path")
     
     args = parser.parse_args()
     
@@ -642,21 +2103,46 @@ def main():
         print(json.dumps(context, indent=2, default=str))
     
     elif args.command == "store_observation":
-        obs_id = store_observation(
-            args.session_id, args.tool, args.input, args.output,
-            args.context, db_path=args.db_path
-        )
+        if args.output_file:
+            with open(args.output_file, "rb") as f:
+                obs_id = store_observation_stream(
+                    args.session_id, args.tool, args.input, f,
+                    args.context, db_path=args.db_path
+                )
+        else:
+            obs_id = store_observation(
+                args.session_id, args.tool, args.input, args.output,
+                args.context, db_path=args.db_path
+            )
         print(f"✅ Observation stored: {obs_id}")
     
     elif args.command == "compress_session":
+        if args.transcript:
+            imported = import_transcript(args.transcript, args.session_id, db_path=args.db_path)
+            print(f"✅ Imported {imported['observations']} observations from {args.transcript}")
         compress_session(args.session_id, args.summary, args.score, args.tokens, args.db_path)
     
+    elif args.command == "import":
+        imported = import_transcript(
+            args.file, args.session_id, args.project, args.task, args.defer_fts, args.db_path
+        )
+        rate = imported["observations"] / imported["seconds"] if imported["seconds"] else 0
+        print(f"✅ Imported {imported['observations']} observations into session {imported['session_id']}"
+              f" ({imported['seconds']}s, {rate:,.0f} rows/s)")
+    
     elif args.command == "query":
         results = query_similar_sessions(args.text, args.limit, args.db_path)
         print(json.dumps(results, indent=2, default=str))
     
     elif args.command == "stats":
+        if args.recount:
+            drift = recount_statistics(args.db_path)
+            for name, (old, new) in drift.items():
+                print(f"🔧 {name}: {old} → {new}", file=sys.stderr)
+            print(f"✅ Counters recounted ({len(drift)} corrected)", file=sys.stderr)
         stats = get_statistics(args.db_path)
+        if args.project:
+            stats["project"] = {"path": args.project, **get_project_statistics(args.project, args.db_path)}
         print(json.dumps(stats, indent=2))
     
     elif args.command == "session":
@@ -678,6 +2164,7 @@ def main():
         elif args.session_action == "end":
             if session_file.exists():
                 session_id = session_file.read_text().strip()
+                ingest_spool()  # Spooled captures may still reference this session
                 compress_session(session_id, args.summary, args.score, 0)
                 session_file.unlink()  # Remove session file
                 print(f"✅ Session ended: {session_id}")
@@ -687,13 +2174,13 @@ def main():
     
     elif args.command == "capture":
         # Auto-init if needed
-        if not DEFAULT_DB_PATH.exists():
+        if args.sync and not DEFAULT_DB_PATH.exists():
             init_database()
         
         # Get or create session
         if session_file.exists():
             session_id = session_file.read_text().strip()
-        else:
+        elif args.sync:
             # Auto-create session
             session_id = create_session(
                 project_path=str(get_project_root()),
@@ -701,17 +2188,64 @@ def main():
             )
             session_file.write_text(session_id)
             print(f"📝 Auto-created session: {session_id}")
+        else:
+            # Auto-create session (spooled, created in SQLite by ingest)
+            session_id = str(uuid4())
+            append_to_spool({
+                "type": "session",
+                "session_id": session_id,
+                "project_path": str(get_project_root()),
+                "task_description": "Auto-session",
+                "start_time": _utc_timestamp()
+            })
+            session_file.write_text(session_id)
+            print(f"📝 Auto-created session: {session_id}")
         
-        # Store observation
-        obs_id = store_observation(
-            session_id=session_id,
-            tool_name=args.tool,
-            input_data=args.description,
-            output_data="captured",
-            context_snapshot=""
-        )
+        # Store observation (fast path: one spool append, no SQLite lock)
+        if args.sync:
+            store_observation(
+                session_id=session_id,
+                tool_name=args.tool,
+                input_data=args.description,
+                output_data="captured",
+                context_snapshot=""
+            )
+        else:
+            append_to_spool({
+                "type": "observation",
+                "observation_id": str(uuid4()),
+                "session_id": session_id,
+                "tool_name": args.tool,
+                "input_data": args.description,
+                "output_data": "captured",
+                "context_snapshot": "",
+                "timestamp": _utc_timestamp()
+            })
         print(f"✅ Captured: {args.description}")
     
+    elif args.command == "maintain":
+        report = run_maintenance(
+            args.budget, args.vacuum,
+            {"raw_days": args.raw_days, "rollup_days": args.rollup_days}, args.db_path
+        )
+        print(json.dumps(report, indent=2))
+        print(f"✅ Maintenance {'complete' if report['complete'] else 'paused (budget spent)'}: "
+              f"{report['reclaimed_bytes'] / 1024:,.0f} KB reclaimed"
+              + (f", {report['grown_bytes'] / 1024:,.0f} KB grown" if report["grown_bytes"] else ""),
+              file=sys.stderr)
+    
+    elif args.command == "fts":
+        result = fts_maintenance(args.action, args.table, args.db_path)
+        for table, status in result.items():
+            print(f"{'✅' if status == 'ok' else '❌'} {table}: {status}")
+        if any(status != "ok" for status in result.values()):
+            sys.exit(1)
+    
+    elif args.command == "ingest":
+        counts = ingest_spool(args.db_path)
+        print(f"✅ Ingested {counts['observations']} observations, {counts['sessions']} sessions"
+              + (f" ({counts['skipped']} malformed lines skipped)" if counts["skipped"] else ""))
+    
     else:
         parser.print_help()
 
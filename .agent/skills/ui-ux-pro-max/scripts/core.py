@@ -6,6 +6,7 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 
 import csv
 import re
+import threading
 from pathlib import Path
 from math import log
 from collections import defaultdict
@@ -92,101 +93,380 @@ _STACK_COLS = {
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
 
+# ============ QUERY PARSING ============
+QUERY_TOKEN_PATTERN = re.compile(r'([+-]?)(?:"([^"]*)"|(\S+))')
+BOOLEAN_OPERATORS = ("AND", "OR", "NOT")
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+# Interned vocabulary shared by every index and query: term -> int id
+TERM_IDS = {}
+_TERM_LOCK = threading.Lock()
+
+
+def tokenize(text):
+    """Lowercase, split, remove punctuation, filter short words"""
+    text = _PUNCTUATION.sub(' ', str(text).lower())
+    return [w for w in text.split() if len(w) > 2]
+
+
+def term_id(term):
+    """Intern a term, returning its shared integer id (index building only)"""
+    tid = TERM_IDS.get(term)
+    if tid is None:
+        with _TERM_LOCK:
+            tid = TERM_IDS.setdefault(term, len(TERM_IDS))
+    return tid
+
+
+def parse_query(query):
+    """
+    Parse query syntax into clauses of token lists.
+
+    Supported: "quoted phrase" (required), +term (required), -term / NOT term
+    (excluded), a OR b (at least one required), a AND b (both required).
+
+    Returns dict with terms (scored, in query order), required, excluded
+    and any_of (list of OR groups).
+    """
+    groups = []
+    negate = False
+    join = None
+    for match in QUERY_TOKEN_PATTERN.finditer(str(query)):
+        sign, phrase, word = match.groups()
+        if phrase is None and not sign and word in BOOLEAN_OPERATORS:
+            if word == "NOT":
+                negate = True
+            else:
+                join = word
+            continue
+        tokens = tokenize(phrase if phrase is not None else word)
+        if tokens:
+            item = {"tokens": tokens, "sign": "-" if negate else sign,
+                    "required": bool(sign == "+" or phrase is not None)}
+            if join == "OR" and groups and item["sign"] != "-" and groups[-1][-1]["sign"] != "-":
+                groups[-1].append(item)
+            else:
+                if join == "AND" and groups:
+                    for prev in groups[-1]:
+                        prev["required"] = True
+                    item["required"] = True
+                groups.append([item])
+        negate = False
+        join = None
+
+    parsed = {"terms": [], "required": [], "excluded": [], "any_of": []}
+    for group in groups:
+        if len(group) > 1:
+            parsed["any_of"].append([item["tokens"] for item in group])
+            for item in group:
+                parsed["terms"].extend(item["tokens"])
+            continue
+        item = group[0]
+        if item["sign"] == "-":
+            parsed["excluded"].append(item["tokens"])
+            continue
+        parsed["terms"].extend(item["tokens"])
+        if item["required"]:
+            parsed["required"].append(item["tokens"])
+    return parsed
+
+
+class Query:
+    """
+    Query tokenized and parsed once, reusable across every domain index.
+
+    Terms are looked up in TERM_IDS without interning them, so unknown query
+    words can't grow the vocabulary; they map to None, which matches no
+    posting. Ids are re-resolved if indexes built later grew the vocabulary.
+    """
+
+    __slots__ = ("text", "terms", "_parsed", "_vocab_size", "_ids")
+
+    def __init__(self, text):
+        self.text = str(text)
+        self._parsed = parse_query(self.text)
+        self.terms = self._parsed["terms"]
+        self._vocab_size = -1
+        self._ids = None
+
+    def _resolve(self):
+        """(term_ids, required, excluded, any_of), refreshed when TERM_IDS has grown"""
+        ids, vocab_size = self._ids, len(TERM_IDS)
+        if ids is None or self._vocab_size != vocab_size:
+            get, parsed = TERM_IDS.get, self._parsed
+            ids = (
+                [get(t) for t in self.terms],
+                [[get(t) for t in tokens] for tokens in parsed["required"]],
+                [[get(t) for t in tokens] for tokens in parsed["excluded"]],
+                [[[get(t) for t in tokens] for tokens in group] for group in parsed["any_of"]],
+            )
+            self._ids, self._vocab_size = ids, vocab_size
+        return ids
+
+    @property
+    def term_ids(self):
+        return self._resolve()[0]
+
+    @property
+    def required(self):
+        return self._resolve()[1]
+
+    @property
+    def excluded(self):
+        return self._resolve()[2]
+
+    @property
+    def any_of(self):
+        return self._resolve()[3]
+
+    def __str__(self):
+        return self.text
+
+    def lower(self):
+        return self.text.lower()
+
+
+def as_query(query):
+    """Return query as a Query, parsing it only if needed"""
+    return query if isinstance(query, Query) else Query(query)
+
+
 # ============ BM25 IMPLEMENTATION ============
+PROXIMITY_WEIGHT = 0.5  # Term-proximity boost used when a search opts in (proximity=True)
+
+
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search (terms keyed by interned id)"""
 
-    def __init__(self, k1=1.5, b=0.75):
+    def __init__(self, k1=1.5, b=0.75, positional=False, proximity_weight=0):
         self.k1 = k1
         self.b = b
+        self.positional = positional
+        self.proximity_weight = proximity_weight
         self.corpus = []
         self.doc_lengths = []
         self.avgdl = 0
         self.idf = {}
         self.doc_freqs = defaultdict(int)
+        self.postings = {}   # term id -> {doc_idx: term frequency}
+        self.positions = {}  # term id -> {doc_idx: [token positions]} (positional only)
         self.N = 0
 
     def tokenize(self, text):
         """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
+        return tokenize(text)
+
+    def parse_query(self, query):
+        """Parse query syntax into clauses of token lists (see parse_query)"""
+        return parse_query(query)
 
     def fit(self, documents):
-        """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
+        """Build BM25 index (postings, plus token positions if positional) from documents"""
+        _count("index_fits")
+        self.corpus = [[term_id(w) for w in tokenize(doc)] for doc in documents]
         self.N = len(self.corpus)
         if self.N == 0:
             return
         self.doc_lengths = [len(doc) for doc in self.corpus]
         self.avgdl = sum(self.doc_lengths) / self.N
 
-        for doc in self.corpus:
-            seen = set()
-            for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
-
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
-
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
-
+        postings = defaultdict(dict)
+        positions = defaultdict(dict)
         for idx, doc in enumerate(self.corpus):
-            score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
-
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
+            for pos, tid in enumerate(doc):
+                postings[tid][idx] = postings[tid].get(idx, 0) + 1
+                if self.positional:
+                    positions[tid].setdefault(idx, []).append(pos)
+        self.postings = dict(postings)
+        self.positions = dict(positions)
+
+        for tid, docs in self.postings.items():
+            freq = len(docs)
+            self.doc_freqs[tid] = freq
+            self.idf[tid] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+
+    def phrase_docs(self, phrase):
+        """Docs containing the exact term-id sequence, via postings intersection"""
+        if not phrase or any(tid not in self.postings for tid in phrase):
+            return set()
+        # Intersect from the rarest term to keep candidate sets small
+        ordered = sorted(set(phrase), key=lambda t: len(self.postings[t]))
+        candidates = set(self.postings[ordered[0]])
+        for tid in ordered[1:]:
+            candidates.intersection_update(self.postings[tid])
+            if not candidates:
+                return set()
+        if not self.positional or len(phrase) == 1:
+            return candidates
+
+        matches = set()
+        for idx in candidates:
+            later = [set(self.positions[tid][idx]) for tid in phrase[1:]]
+            for start in self.positions[phrase[0]][idx]:
+                if all(start + offset in pos_set for offset, pos_set in enumerate(later, 1)):
+                    matches.add(idx)
+                    break
+        return matches
+
+    def candidate_docs(self, query):
+        """
+        Resolve boolean clauses to doc-id sets via postings set operations.
+
+        Returns (allowed, excluded): allowed is None when no clause restricts
+        the candidates, otherwise the exact set of docs eligible for scoring.
+        """
+        allowed = None
+        clauses = [self.phrase_docs(ids) for ids in query.required]
+        clauses += [set().union(*(self.phrase_docs(ids) for ids in group)) for group in query.any_of]
+        for docs in sorted(clauses, key=len):
+            allowed = docs if allowed is None else allowed & docs
+            if not allowed:
+                return set(), set()
+
+        excluded = set()
+        for ids in query.excluded:
+            excluded |= self.phrase_docs(ids)
+        if allowed is not None:
+            return allowed - excluded, set()
+        return None, excluded
+
+    def _min_distance(self, term_a, term_b, idx):
+        """Smallest forward gap between term_a and term_b in a document"""
+        best = None
+        for pa in self.positions[term_a][idx]:
+            for pb in self.positions[term_b][idx]:
+                gap = pb - pa if pb > pa else (pa - pb) + 1  # penalize reversed order
+                if best is None or gap < best:
+                    best = gap
+        return best
+
+    def _proximity_boost(self, terms, scores, allowed=None, excluded=frozenset(), proximity_weight=PROXIMITY_WEIGHT):
+        """Boost docs where consecutive query terms appear close together"""
+        for term_a, term_b in zip(terms, terms[1:]):
+            if term_a == term_b or term_a not in self.positions or term_b not in self.positions:
+                continue
+            weight = proximity_weight * min(self.idf[term_a], self.idf[term_b])
+            docs_a = self.positions[term_a]
+            docs_b = self.positions[term_b]
+            if len(docs_a) > len(docs_b):
+                docs_a, docs_b = docs_b, docs_a
+            for idx in docs_a:
+                if (allowed is not None and idx not in allowed) or idx in excluded:
+                    continue
+                if idx in docs_b:
+                    scores[idx] += weight / self._min_distance(term_a, term_b, idx)
+
+    def score(self, query, proximity_weight=None):
+        """
+        Score all documents against query (str or Query; phrase and boolean syntax).
+        proximity_weight > 0 (default: the index's own, 0) adds a boost for
+        consecutive query terms that appear close together (positional only).
+        """
+        if proximity_weight is None:
+            proximity_weight = self.proximity_weight
+        query = as_query(query)
+        terms = query.term_ids
+        scores = [0] * self.N
+
+        # Boolean clauses narrow the candidate set before any scoring work
+        allowed, excluded = self.candidate_docs(query)
+        if allowed is not None and not allowed:
+            return list(enumerate(scores))
+
+        for tid in terms:
+            idf = self.idf.get(tid)
+            if idf is not None:
+                for idx, tf in self.postings[tid].items():
+                    if (allowed is not None and idx not in allowed) or idx in excluded:
+                        continue
                     numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+                    denominator = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[idx] / self.avgdl)
+                    scores[idx] += idf * numerator / denominator
 
-            scores.append((idx, score))
+        if self.positional and proximity_weight and self.N:
+            self._proximity_boost(terms, scores, allowed, excluded, proximity_weight)
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+        return sorted(enumerate(scores), key=lambda x: x[1], reverse=True)
 
 
 # ============ SEARCH FUNCTIONS ============
+# Work counters for profiling (see design_system.StageProfiler)
+COUNTERS = {"csv_loads": 0, "index_fits": 0}
+_COUNTERS_LOCK = threading.Lock()
+
+
+def _count(name):
+    """Increment a work counter"""
+    with _COUNTERS_LOCK:
+        COUNTERS[name] += 1
+
+
+def get_counters():
+    """Snapshot of work counters"""
+    with _COUNTERS_LOCK:
+        return dict(COUNTERS)
+
+
 def _load_csv(filepath):
     """Load CSV and return list of dicts"""
+    _count("csv_loads")
     with open(filepath, 'r', encoding='utf-8') as f:
         return list(csv.DictReader(f))
 
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
-    """Core search function using BM25"""
-    if not filepath.exists():
-        return []
+# Fitted indexes shared by every caller: (path, search_cols) -> (mtime, rows, BM25)
+_INDEX_CACHE = {}
+_INDEX_LOCKS = defaultdict(threading.Lock)
+_INDEX_LOCKS_GUARD = threading.Lock()
 
-    data = _load_csv(filepath)
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+def get_index(filepath, search_cols):
+    """Return (rows, fitted BM25) for a CSV, rebuilt only when the file changes"""
+    key = (str(filepath), tuple(search_cols))
+    mtime = filepath.stat().st_mtime_ns
+    cached = _INDEX_CACHE.get(key)
+    if cached and cached[0] == mtime:
+        return cached[1], cached[2]
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
+    with _INDEX_LOCKS_GUARD:
+        lock = _INDEX_LOCKS[key]
+    with lock:
+        cached = _INDEX_CACHE.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+        data = _load_csv(filepath)
+        # Build documents from search columns
+        documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
+        bm25 = BM25(positional=True)  # Positions for exact phrases; scores stay plain BM25
+        bm25.fit(documents)
+        _INDEX_CACHE[key] = (mtime, data, bm25)
+    return data, bm25
 
-    # Get top results with score > 0
+
+def clear_index_cache():
+    """Drop all cached indexes (they are rebuilt lazily on next search)"""
+    _INDEX_CACHE.clear()
+
+
+def _rank(data, bm25, output_cols, query, max_results, proximity=False):
+    """Top rows (output columns only) with score > 0 from a fitted index"""
     results = []
-    for idx, score in ranked[:max_results]:
+    for idx, score in bm25.score(query, PROXIMITY_WEIGHT if proximity else 0)[:max_results]:
         if score > 0:
             row = data[idx]
             results.append({col: row.get(col, "") for col in output_cols if col in row})
-
     return results
 
 
+def _search_csv(filepath, search_cols, output_cols, query, max_results, proximity=False):
+    """Core search function using BM25"""
+    if not filepath.exists():
+        return []
+
+    data, bm25 = get_index(filepath, search_cols)
+    return _rank(data, bm25, output_cols, query, max_results, proximity)
+
+
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
     query_lower = query.lower()
@@ -209,8 +489,11 @@ def detect_domain(query):
     return best if scores[best] > 0 else "style"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
+def search(query, domain=None, max_results=MAX_RESULTS, proximity=False):
+    """
+    Main search function with auto-domain detection (query: str or Query).
+    proximity=True also rewards query terms appearing close together.
+    """
     if domain is None:
         domain = detect_domain(query)
 
@@ -220,19 +503,50 @@ def search(query, domain=None, max_results=MAX_RESULTS):
     if not filepath.exists():
         return {"error": f"File not found: {filepath}", "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results, proximity)
 
     return {
         "domain": domain,
-        "query": query,
+        "query": str(query),
         "file": config["file"],
         "count": len(results),
         "results": results
     }
 
 
+def search_many(queries, domain, max_results=MAX_RESULTS):
+    """
+    Run many queries against one domain index, resolving the index once.
+
+    Identical query texts are scored once. Returns a list of result dicts in
+    the same shape and order as calling search() for each query.
+    """
+    config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+    filepath = DATA_DIR / config["file"]
+
+    if not filepath.exists():
+        return [{"error": f"File not found: {filepath}", "domain": domain} for _ in queries]
+
+    data, bm25 = get_index(filepath, config["search_cols"])
+    ranked = {}
+    responses = []
+    for query in queries:
+        text = str(query)
+        if text not in ranked:
+            ranked[text] = _rank(data, bm25, config["output_cols"], query, max_results)
+        results = ranked[text]
+        responses.append({
+            "domain": domain,
+            "query": text,
+            "file": config["file"],
+            "count": len(results),
+            "results": list(results)
+        })
+    return responses
+
+
 def search_stack(query, stack, max_results=MAX_RESULTS):
-    """Search stack-specific guidelines"""
+    """Search stack-specific guidelines (query: str or Query)"""
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
 
@@ -246,7 +560,7 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
     return {
         "domain": "stack",
         "stack": stack,
-        "query": query,
+        "query": str(query),
         "file": STACK_CONFIG[stack]["file"],
         "count": len(results),
         "results": results
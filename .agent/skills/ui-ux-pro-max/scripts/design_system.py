@@ -11,14 +11,27 @@ Usage:
     # With persistence (Master + Overrides pattern)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True, page="dashboard")
+    result = generate_design_system("SaaS dashboard", "My Project", persist=True, pages=["dashboard", "pricing"])
+
+    # Long-running processes share one generator; it reloads ui-reasoning.csv
+    # when the file changes, and reload() forces a refresh of all data
+    get_generator().reload()
 """
 
 import csv
+import hashlib
 import json
 import os
+import re
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
-from core import search, DATA_DIR
+from core import (search, search_many, as_query, clear_index_cache, get_counters, get_index,
+                  CSV_CONFIG, DATA_DIR)
 
 
 # ============ CONFIGURATION ============
@@ -32,13 +45,288 @@ SEARCH_CONFIG = {
     "typography": {"max_results": 2}
 }
 
+# Domain searches are independent (CSV read + index build), so they fan out
+# over a shared thread pool instead of running one after another
+MAX_SEARCH_WORKERS = len(SEARCH_CONFIG)
+_search_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for concurrent domain searches."""
+    global _search_executor
+    if _search_executor is None:
+        with _executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(max_workers=MAX_SEARCH_WORKERS,
+                                                      thread_name_prefix="ds-search")
+    return _search_executor
+
+
+# ============ PROFILING ============
+class StageProfiler:
+    """
+    Opt-in per-stage timer: wall and CPU time, core CSV loads / index fits,
+    and output sizes. Thread-safe, so one profiler can span a batch run.
+    CPU time is process-wide (includes search worker threads).
+    """
+
+    def __init__(self):
+        self.stages = {}   # name -> {"calls", "wall_s", "cpu_s"}, in first-seen order
+        self.outputs = {}  # name -> size in bytes
+        self._lock = threading.Lock()
+        self._counters = get_counters()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block under a stage name."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            with self._lock:
+                entry = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+                entry["calls"] += 1
+                entry["wall_s"] += wall
+                entry["cpu_s"] += cpu
+
+    def record_output(self, name: str, content: str) -> None:
+        """Record the size of an output (stdout text, persisted file, ...)."""
+        with self._lock:
+            self.outputs[name] = self.outputs.get(name, 0) + len(content.encode("utf-8"))
+
+    def to_dict(self) -> dict:
+        """Profile as a JSON-serializable dict."""
+        counters = get_counters()
+        with self._lock:
+            return {
+                "total_wall_s": time.perf_counter() - self._wall,
+                "total_cpu_s": time.process_time() - self._cpu,
+                "stages": [dict(stage=name, **entry) for name, entry in self.stages.items()],
+                "counters": {k: counters[k] - self._counters.get(k, 0) for k in counters},
+                "outputs": dict(self.outputs)
+            }
+
+
+class _NullProfiler:
+    """Profiler stand-in used when profiling is off."""
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def record_output(self, name: str, content: str) -> None:
+        pass
+
+
+NULL_PROFILER = _NullProfiler()
+
+
+def format_profile(profile: dict) -> str:
+    """Format a StageProfiler.to_dict() result as a compact table."""
+    lines = []
+    lines.append(f"{'STAGE':<28} {'CALLS':>5} {'WALL ms':>9} {'CPU ms':>9}")
+    lines.append("-" * 54)
+    for s in profile["stages"]:
+        lines.append(f"{s['stage'][:28]:<28} {s['calls']:>5} {s['wall_s'] * 1000:>9.2f} {s['cpu_s'] * 1000:>9.2f}")
+    lines.append("-" * 54)
+    lines.append(f"{'TOTAL':<28} {'':>5} {profile['total_wall_s'] * 1000:>9.2f} {profile['total_cpu_s'] * 1000:>9.2f}")
+    counters = profile.get("counters", {})
+    lines.append(f"CSV loads: {counters.get('csv_loads', 0)} | Index fits: {counters.get('index_fits', 0)}")
+    outputs = profile.get("outputs", {})
+    if outputs:
+        lines.append("Outputs: " + ", ".join(f"{name} {size:,} B" for name, size in outputs.items()))
+    return "\n".join(lines)
+
+
+# ============ DECISION RULES ============
+# Decision_Rules keys are "if_<condition>" or "must_have"; values are
+# hyphenated actions ("switch-to-liquid-glass", "add-urgency-colors", ...)
+RULE_ACTION_VERBS = ("switch-to-", "prioritize-", "use-", "add-")
+RULE_QUALIFIERS = {"focused", "needed", "ready", "metric", "field"}  # Dropped from conditions
+PALETTE_NOUNS = {"colors", "colours", "accents", "palette"}
+_RULE_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _rule_words(text: str) -> set:
+    """Lowercase words with a naive plural strip, shared by conditions and context."""
+    return {w[:-1] if len(w) > 3 and w.endswith("s") else w for w in _RULE_WORD.findall(text.lower())}
+
+
+def _compile_action(action: str, style_names: list) -> tuple:
+    """Compile an action string into (effect, target)."""
+    obj = action.lower().strip()
+    for verb in RULE_ACTION_VERBS:
+        if obj.startswith(verb):
+            obj = obj[len(verb):]
+            break
+    words = obj.replace("-", " ").split()
+    phrase = f" {' '.join(words)} "
+    for name in style_names:  # File order, so "brutalism" hits Brutalism before Neubrutalism
+        if phrase in f" {' '.join(_RULE_WORD.findall(name.lower()))} ":
+            return "style", name
+    if words and words[-1] in PALETTE_NOUNS:
+        return "palette", frozenset(_rule_words(" ".join(words[:-1])))
+    return "feature", action
+
+
+class _JSONPairs(list):
+    """Key/value pairs of a parsed JSON object, in order (keeps duplicate keys)."""
+
+
+def compile_decision_rules(blob: str, style_names: list) -> tuple:
+    """
+    Compile a Decision_Rules JSON blob into decision-table rows
+    (condition words, rule key, action, effect, target). Unconditional rows
+    ("must_have") have an empty condition. Duplicate keys are all kept;
+    anything but a JSON object compiles to an empty table.
+    """
+    try:
+        pairs = json.loads(blob or "{}", object_pairs_hook=_JSONPairs)
+    except json.JSONDecodeError:
+        return ()
+    if not isinstance(pairs, _JSONPairs):
+        return ()
+
+    table = []
+    for key, action in pairs:
+        if not isinstance(action, str) or not action.strip():
+            continue
+        condition = frozenset()
+        if key.startswith("if_"):
+            condition = frozenset(_rule_words(key[3:].replace("_", " ")) - RULE_QUALIFIERS)
+        effect, target = _compile_action(action, style_names)
+        table.append((condition, key, action.strip(), effect, target))
+    return tuple(table)
+
+
+# ============ REASONING INDEX ============
+def _category_tokens(text: str) -> list:
+    """Words of a (lowercased) category name: split on whitespace, "/" and "-"."""
+    return text.replace("/", " ").replace("-", " ").split()
+
+
+def _token_keys(token: str) -> list:
+    """A query word plus its prefixes of 4+ letters ("educational" also finds "education")."""
+    return [token] + [token[:k] for k in range(4, len(token))]
+
+
+class ReasoningIndex:
+    """
+    Reasoning rules compiled for fast lookup by product category.
+
+    Keeps the original match precedence (exact, then containment, then shared
+    keyword); containment resolves to the first rule in file order, shared
+    keywords to the rule whose shared words are rarest overall. Lookups go
+    through an exact-match dict and a token -> rule-indexes inverted index
+    (probed with each category word and its prefixes, see _token_keys), so
+    only rules sharing a word with the category are ever compared; results
+    are cached per category. Decision_Rules are compiled up front into one
+    decision table per rule.
+    """
+
+    def __init__(self, rules: list, style_names: list = None):
+        self.rules = rules
+        style_names = style_names or []
+        self.decision_tables = [compile_decision_rules(rule.get("Decision_Rules", ""), style_names)
+                                for rule in rules]
+        self.names = [rule.get("UI_Category", "").lower() for rule in rules]
+        self.exact = {}
+        self.token_rules = {}  # token -> rule indexes containing it, in file order
+        for idx, name in enumerate(self.names):
+            self.exact.setdefault(name, idx)
+            for token in dict.fromkeys(_category_tokens(name)):
+                self.token_rules.setdefault(token, []).append(idx)
+        self._decision_rules = {}
+        self._cache = {}
+
+    def find(self, category: str):
+        """Return index of the matching rule for a category, or None."""
+        category_lower = category.lower()
+        if category_lower in self._cache:
+            return self._cache[category_lower]
+
+        idx = self.exact.get(category_lower)
+        if idx is None:
+            # Each category word scores 1/(rules it matches) for every rule it matches, so
+            # rare words ("fintech") outweigh generic ones ("app", "tech")
+            scores = {}
+            for token in dict.fromkeys(_category_tokens(category_lower)):
+                matched = {i for key in _token_keys(token) for i in self.token_rules.get(key, ())}
+                for i in matched:
+                    scores[i] = scores.get(i, 0) + 1 / len(matched)
+            candidates = sorted(scores)
+            # Containment first (rule name in category or vice versa), else the
+            # best-scoring rule sharing a keyword (earliest on ties)
+            idx = next((i for i in candidates
+                        if self.names[i] in category_lower or category_lower in self.names[i]),
+                       min(candidates, key=lambda i: -scores[i]) if candidates else None)
+
+        self._cache[category_lower] = idx
+        return idx
+
+    def decision_rules(self, idx: int) -> dict:
+        """
+        A rule's Decision_Rules as a dict, built from its decision table so
+        both agree; a repeated key's actions are joined with ", ".
+        """
+        if idx not in self._decision_rules:
+            merged = {}
+            for _, key, action, _, _ in self.decision_tables[idx]:
+                merged[key] = f"{merged[key]}, {action}" if key in merged else action
+            self._decision_rules[idx] = merged
+        return dict(self._decision_rules[idx])
+
+    def evaluate(self, idx: int, context: set) -> list:
+        """
+        Evaluate a rule's decision table against context words (see _rule_words).
+        A row fires when all of its condition words are in the context;
+        returns the fired rows as dicts, in table order.
+        """
+        return [{"rule": key, "action": action, "effect": effect,
+                 "target": " ".join(sorted(target)) if effect == "palette" else target}
+                for condition, key, action, effect, target in self.decision_tables[idx]
+                if condition <= context]
+
 
 # ============ DESIGN SYSTEM GENERATOR ============
 class DesignSystemGenerator:
     """Generates design system recommendations from aggregated searches."""
 
     def __init__(self):
-        self.reasoning_data = self._load_reasoning()
+        self._reload_lock = threading.Lock()
+        self._reasoning_mtime = None
+        self._refresh_reasoning(force=True)
+
+    def _reasoning_file_mtime(self):
+        """Modification time of the reasoning CSV (None if missing)."""
+        try:
+            return (DATA_DIR / REASONING_FILE).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh_reasoning(self, force: bool = False) -> bool:
+        """(Re)load reasoning rules if the CSV changed since the last load."""
+        mtime = self._reasoning_file_mtime()
+        if not force and mtime == self._reasoning_mtime:
+            return False
+        with self._reload_lock:
+            if not force and mtime == self._reasoning_mtime:
+                return False
+            data = self._load_reasoning()
+            # Swap the compiled index in one assignment so readers never see
+            # rules and index from different loads
+            self.reasoning_index = ReasoningIndex(data, self._load_style_names())
+            self.reasoning_data = data
+            self._reasoning_mtime = mtime
+        return True
+
+    def reload(self) -> None:
+        """Force reload of reasoning rules and the shared core search indexes."""
+        clear_index_cache()
+        self._refresh_reasoning(force=True)
 
     def _load_reasoning(self) -> list:
         """Load reasoning rules from CSV."""
@@ -48,48 +336,37 @@ class DesignSystemGenerator:
         with open(filepath, 'r', encoding='utf-8') as f:
             return list(csv.DictReader(f))
 
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
-        results = {}
-        for domain, config in SEARCH_CONFIG.items():
+    def _load_style_names(self) -> list:
+        """Style names (file order) that decision-rule actions can resolve to."""
+        config = CSV_CONFIG["style"]
+        filepath = DATA_DIR / config["file"]
+        if not filepath.exists():
+            return []
+        rows, _ = get_index(filepath, config["search_cols"])
+        return [row.get("Style Category", "") for row in rows if row.get("Style Category")]
+
+    def _submit_searches(self, query, domains: list, style_priority: list = None) -> dict:
+        """Submit domain searches to the shared pool; returns {domain: future}."""
+        executor = _get_search_executor()
+        futures = {}
+        for domain in domains:
+            domain_query = query
             if domain == "style" and style_priority:
                 # For style, also search with priority keywords
-                priority_query = " ".join(style_priority[:2]) if style_priority else query
-                combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
-            else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
-
-    def _find_reasoning_rule(self, category: str) -> dict:
-        """Find matching reasoning rule for a category."""
-        category_lower = category.lower()
-
-        # Try exact match first
-        for rule in self.reasoning_data:
-            if rule.get("UI_Category", "").lower() == category_lower:
-                return rule
-
-        # Try partial match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            if ui_cat in category_lower or category_lower in ui_cat:
-                return rule
-
-        # Try keyword match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            keywords = ui_cat.replace("/", " ").replace("-", " ").split()
-            if any(kw in category_lower for kw in keywords):
-                return rule
-
-        return {}
+                domain_query = as_query(f"{query} {' '.join(style_priority[:2])}")
+            futures[domain] = executor.submit(search, domain_query, domain, SEARCH_CONFIG[domain]["max_results"])
+        return futures
 
     def _apply_reasoning(self, category: str, search_results: dict) -> dict:
-        """Apply reasoning rules to search results."""
-        rule = self._find_reasoning_rule(category)
-
-        if not rule:
+        """
+        Apply reasoning rules to search results. search_results may carry
+        "query" (str or core.Query) and "product" (search() result); their words
+        are the context the compiled Decision_Rules are evaluated against.
+        """
+        index = self.reasoning_index
+        idx = index.find(category)
+
+        if idx is None:
             return {
                 "pattern": "Hero + Features + CTA",
                 "style_priority": ["Minimalism", "Flat Design"],
@@ -98,27 +375,46 @@ class DesignSystemGenerator:
                 "key_effects": "Subtle hover transitions",
                 "anti_patterns": "",
                 "decision_rules": {},
+                "applied_rules": [],
+                "palette_hints": [],
                 "severity": "MEDIUM"
             }
 
-        # Parse decision rules JSON
-        decision_rules = {}
-        try:
-            decision_rules = json.loads(rule.get("Decision_Rules", "{}"))
-        except json.JSONDecodeError:
-            pass
-
+        context_text = [str(search_results.get("query", ""))]
+        for row in search_results.get("product", {}).get("results", [])[:1]:
+            context_text += [row.get("Product Type", ""), row.get("Keywords", "")]
+        applied = index.evaluate(idx, _rule_words(" ".join(context_text)))
+
+        rule = index.rules[idx]
+        style_priority = [s.strip() for s in rule.get("Style_Priority", "").split("+")]
+        # Styles preferred by fired rules go first; the style search and
+        # best-match selection both read style_priority in order
+        preferred = [a["target"] for a in applied if a["effect"] == "style"]
+        style_priority = list(dict.fromkeys(preferred + style_priority))
         return {
             "pattern": rule.get("Recommended_Pattern", ""),
-            "style_priority": [s.strip() for s in rule.get("Style_Priority", "").split("+")],
+            "style_priority": style_priority,
             "color_mood": rule.get("Color_Mood", ""),
             "typography_mood": rule.get("Typography_Mood", ""),
             "key_effects": rule.get("Key_Effects", ""),
             "anti_patterns": rule.get("Anti_Patterns", ""),
-            "decision_rules": decision_rules,
+            "decision_rules": index.decision_rules(idx),
+            "applied_rules": applied,
+            "palette_hints": [a["target"] for a in applied if a["effect"] == "palette" and a["target"]],
             "severity": rule.get("Severity", "MEDIUM")
         }
 
+    def _select_palette(self, results: list, hints: list) -> dict:
+        """Pick the color result matching the most palette hint words (first result on ties)."""
+        if not results:
+            return {}
+        if not hints:
+            return results[0]
+        words = _rule_words(" ".join(hints))
+        scored = [(len(words & _rule_words(" ".join(str(v) for v in result.values()))), -i, result)
+                  for i, result in enumerate(results)]
+        return max(scored, key=lambda x: x[:2])[2]
+
     def _select_best_match(self, results: list, priority_keywords: list) -> dict:
         """Select best matching result based on priority keywords."""
         if not results:
@@ -160,33 +456,47 @@ class DesignSystemGenerator:
         """Extract results list from search result dict."""
         return search_result.get("results", [])
 
-    def generate(self, query: str, project_name: str = None) -> dict:
-        """Generate complete design system recommendation."""
-        # Step 1: First search product to get category
-        product_result = search(query, "product", 1)
+    def generate(self, query: str, project_name: str = None, profiler: "StageProfiler" = None) -> dict:
+        """Generate complete design system recommendation (optionally profiled per stage)."""
+        profiler = profiler or NULL_PROFILER
+        with profiler.stage("reasoning reload check"):
+            self._refresh_reasoning()
+
+        # Tokenize once; the parsed query is reused by every domain search
+        parsed_query = as_query(query)
+
+        # Step 1: Search product to get category; domains that don't depend on
+        # the reasoning rules start concurrently instead of waiting for it
+        with profiler.stage("product search"):
+            futures = self._submit_searches(parsed_query, [d for d in SEARCH_CONFIG if d != "style"])
+            product_result = futures["product"].result()
         product_results = product_result.get("results", [])
         category = "General"
         if product_results:
             category = product_results[0].get("Product Type", "General")
 
-        # Step 2: Get reasoning rules for this category
-        reasoning = self._apply_reasoning(category, {})
+        # Step 2: Get reasoning rules for this category and evaluate its
+        # compiled decision table against the query and product match
+        with profiler.stage("reasoning lookup"):
+            reasoning = self._apply_reasoning(category, {"query": parsed_query, "product": product_result})
         style_priority = reasoning.get("style_priority", [])
 
-        # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
-        search_results["product"] = product_result  # Reuse product search
+        # Step 3: Style search with priority hints, then collect every domain
+        with profiler.stage("multi-domain search"):
+            futures.update(self._submit_searches(parsed_query, ["style"], style_priority))
+            search_results = {domain: futures[domain].result() for domain in SEARCH_CONFIG}
 
         # Step 4: Select best matches from each domain using priority
-        style_results = self._extract_results(search_results.get("style", {}))
-        color_results = self._extract_results(search_results.get("color", {}))
-        typography_results = self._extract_results(search_results.get("typography", {}))
-        landing_results = self._extract_results(search_results.get("landing", {}))
+        with profiler.stage("best-match selection"):
+            style_results = self._extract_results(search_results.get("style", {}))
+            color_results = self._extract_results(search_results.get("color", {}))
+            typography_results = self._extract_results(search_results.get("typography", {}))
+            landing_results = self._extract_results(search_results.get("landing", {}))
 
-        best_style = self._select_best_match(style_results, reasoning.get("style_priority", []))
-        best_color = color_results[0] if color_results else {}
-        best_typography = typography_results[0] if typography_results else {}
-        best_landing = landing_results[0] if landing_results else {}
+            best_style = self._select_best_match(style_results, reasoning.get("style_priority", []))
+            best_color = self._select_palette(color_results, reasoning.get("palette_hints", []))
+            best_typography = typography_results[0] if typography_results else {}
+            best_landing = landing_results[0] if landing_results else {}
 
         # Step 5: Build final recommendation
         # Combine effects from both reasoning and style search
@@ -232,6 +542,7 @@ class DesignSystemGenerator:
             "key_effects": combined_effects,
             "anti_patterns": reasoning.get("anti_patterns", ""),
             "decision_rules": reasoning.get("decision_rules", {}),
+            "applied_rules": reasoning.get("applied_rules", []),
             "severity": reasoning.get("severity", "MEDIUM")
         }
 
@@ -239,6 +550,11 @@ class DesignSystemGenerator:
 # ============ OUTPUT FORMATTERS ============
 BOX_WIDTH = 90  # Wider box for more content
 
+def format_applied_rules(design_system: dict) -> str:
+    """Fired decision-rule actions as one line ("booking-system + add-gold-accents")."""
+    return " + ".join(rule["action"] for rule in design_system.get("applied_rules", []))
+
+
 def format_ascii_box(design_system: dict) -> str:
     """Format design system as ASCII box with emojis (MCP-style)."""
     project = design_system.get("project_name", "PROJECT")
@@ -248,6 +564,7 @@ def format_ascii_box(design_system: dict) -> str:
     typography = design_system.get("typography", {})
     effects = design_system.get("key_effects", "")
     anti_patterns = design_system.get("anti_patterns", "")
+    rules = format_applied_rules(design_system)
 
     def wrap_text(text: str, prefix: str, width: int) -> list:
         """Wrap long text into multiple lines."""
@@ -337,6 +654,13 @@ def format_ascii_box(design_system: dict) -> str:
             lines.append(line.ljust(BOX_WIDTH) + "|")
         lines.append("|" + " " * BOX_WIDTH + "|")
 
+    # Decision rules fired for this query
+    if rules:
+        lines.append("|  PRODUCT RULES:".ljust(BOX_WIDTH) + "|")
+        for line in wrap_text(rules, "|     ", BOX_WIDTH):
+            lines.append(line.ljust(BOX_WIDTH) + "|")
+        lines.append("|" + " " * BOX_WIDTH + "|")
+
     # Anti-patterns section
     if anti_patterns:
         lines.append("|  AVOID (Anti-patterns):".ljust(BOX_WIDTH) + "|")
@@ -364,6 +688,11 @@ def format_ascii_box(design_system: dict) -> str:
     return "\n".join(lines)
 
 
+def format_json(design_system: dict) -> str:
+    """Format design system as JSON (the full generate() dict) for tooling."""
+    return json.dumps(design_system, indent=2, ensure_ascii=False) + "\n"
+
+
 def format_markdown(design_system: dict) -> str:
     """Format design system as markdown."""
     project = design_system.get("project_name", "PROJECT")
@@ -373,6 +702,7 @@ def format_markdown(design_system: dict) -> str:
     typography = design_system.get("typography", {})
     effects = design_system.get("key_effects", "")
     anti_patterns = design_system.get("anti_patterns", "")
+    rules = format_applied_rules(design_system)
 
     lines = []
     lines.append(f"## Design System: {project}")
@@ -437,6 +767,12 @@ def format_markdown(design_system: dict) -> str:
         lines.append(f"{effects}")
         lines.append("")
 
+    # Decision rules fired for this query
+    if rules:
+        lines.append("### Product Rules")
+        lines.append(f"{rules}")
+        lines.append("")
+
     # Anti-patterns section
     if anti_patterns:
         lines.append("### Avoid (Anti-patterns)")
@@ -459,36 +795,112 @@ def format_markdown(design_system: dict) -> str:
 
 
 # ============ MAIN ENTRY POINT ============
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> DesignSystemGenerator:
+    """Return the shared, thread-safe DesignSystemGenerator instance."""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = DesignSystemGenerator()
+    return _generator
+
+
 def generate_design_system(query: str, project_name: str = None, output_format: str = "ascii", 
-                           persist: bool = False, page: str = None, output_dir: str = None) -> str:
+                           persist: bool = False, page: str = None, output_dir: str = None,
+                           pages: list = None, profiler: StageProfiler = None) -> str:
     """
     Main entry point for design system generation.
 
     Args:
         query: Search query (e.g., "SaaS dashboard", "e-commerce luxury")
         project_name: Optional project name for output header
-        output_format: "ascii" (default) or "markdown"
+        output_format: "ascii" (default), "markdown" or "json"
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        pages: Optional list of page names; all overrides share one generation
+        profiler: Optional StageProfiler to record per-stage timings
 
     Returns:
         Formatted design system string
     """
-    generator = DesignSystemGenerator()
-    design_system = generator.generate(query, project_name)
+    design_system = get_generator().generate(query, project_name, profiler)
     
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
+        persist_design_system(design_system, page, output_dir, query, pages=pages, profiler=profiler)
+
+    with (profiler or NULL_PROFILER).stage("formatting"):
+        output = format_design_system(design_system, output_format)
+    (profiler or NULL_PROFILER).record_output("formatted output", output)
+    return output
+
 
+def format_design_system(design_system: dict, output_format: str = "ascii") -> str:
+    """Render a generated design system in the requested output format."""
     if output_format == "markdown":
         return format_markdown(design_system)
+    if output_format == "json":
+        return format_json(design_system)
     return format_ascii_box(design_system)
 
 
 # ============ PERSISTENCE FUNCTIONS ============
-def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None) -> dict:
+SIDECAR_FILE = "design-system.json"
+
+# "Generated:" lines change on every run, so they are excluded from content hashes
+_TIMESTAMP_LINE = re.compile(r"^(?:> )?\*\*Generated:\*\*.*$", re.MULTILINE)
+
+
+def content_hash(content: str) -> str:
+    """Stable SHA-256 of rendered design-system content, ignoring timestamps."""
+    return hashlib.sha256(_TIMESTAMP_LINE.sub("", content).encode("utf-8")).hexdigest()
+
+
+
+
+def _write_if_changed(path: Path, content: str) -> str:
+    """
+    Write content atomically (temp file + rename) unless only the timestamp differs.
+
+    Returns:
+        "created", "updated" or "unchanged"
+    """
+    if path.exists():
+        mode = stat.S_IMODE(path.stat().st_mode)
+        try:
+            existing = path.read_text(encoding='utf-8')
+        except (OSError, UnicodeDecodeError):
+            existing = None
+        if existing is not None and content_hash(existing) == content_hash(content):
+            return "unchanged"
+        status = "updated"
+    else:
+        mode = None  # New files keep the umask-derived mode they are created with
+        status = "created"
+
+    tmp_path = path.parent / f".{path.name}.{os.urandom(6).hex()}.tmp"
+    # Created like open() would (0o666 minus the umask, applied by the kernel), but exclusively
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+        if mode is not None:
+            os.chmod(tmp_path, mode)  # Keep the existing file's permissions
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return status
+
+
+def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None,
+                          write_master: bool = True, pages: list = None, profiler: StageProfiler = None) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
     
@@ -497,9 +909,18 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        write_master: If False, only write the page override (MASTER.md already persisted)
+        pages: Optional list of page names; their override searches run as one batch
+        profiler: Optional StageProfiler to record persistence timings and file sizes
     
+    Alongside MASTER.md, design-system.json holds the full generate() dict so
+    tooling can load colors, fonts and patterns without parsing markdown.
+    Files whose content is unchanged apart from the "Generated" timestamp are
+    left untouched; changed files are replaced atomically.
+
     Returns:
-        dict with created file paths and status
+        dict with status, created_files (every persisted path) and files
+        ({path: "created" | "updated" | "unchanged"})
     """
     base_dir = Path(output_dir) if output_dir else Path.cwd()
     
@@ -511,31 +932,45 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
     pages_dir = design_system_dir / "pages"
     
     created_files = []
+    files = {}
     
     # Create directories
     design_system_dir.mkdir(parents=True, exist_ok=True)
     pages_dir.mkdir(parents=True, exist_ok=True)
     
     master_file = design_system_dir / "MASTER.md"
+    sidecar_file = design_system_dir / SIDECAR_FILE
     
-    # Generate and write MASTER.md
-    master_content = format_master_md(design_system)
-    with open(master_file, 'w', encoding='utf-8') as f:
-        f.write(master_content)
-    created_files.append(str(master_file))
+    profiler = profiler or NULL_PROFILER
+
+    # Generate and write MASTER.md plus its machine-readable sidecar
+    if write_master:
+        with profiler.stage("persist master"):
+            master_content = format_master_md(design_system)
+            sidecar_content = format_json(design_system)
+            files[str(master_file)] = _write_if_changed(master_file, master_content)
+            files[str(sidecar_file)] = _write_if_changed(sidecar_file, sidecar_content)
+        created_files.extend([str(master_file), str(sidecar_file)])
+        profiler.record_output(master_file.name, master_content)
+        profiler.record_output(sidecar_file.name, sidecar_content)
     
-    # If page is specified, create page override file with intelligent content
-    if page:
-        page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, 'w', encoding='utf-8') as f:
-            f.write(page_content)
+    # If pages are specified, create page override files with intelligent content
+    page_names = list(dict.fromkeys(([page] if page else []) + list(pages or [])))
+    with profiler.stage("page override searches"):
+        page_searches = _page_override_searches(page_names, page_query)
+    for page_name in page_names:
+        page_file = pages_dir / f"{page_name.lower().replace(' ', '-')}.md"
+        with profiler.stage("persist pages"):
+            page_content = format_page_override_md(design_system, page_name, page_query, page_searches[page_name])
+            files[str(page_file)] = _write_if_changed(page_file, page_content)
         created_files.append(str(page_file))
+        profiler.record_output(f"pages/{page_file.name}", page_content)
     
     return {
         "status": "success",
         "design_system_dir": str(design_system_dir),
-        "created_files": created_files
+        "created_files": created_files,
+        "files": files
     }
 
 
@@ -548,6 +983,7 @@ def format_master_md(design_system: dict) -> str:
     typography = design_system.get("typography", {})
     effects = design_system.get("key_effects", "")
     anti_patterns = design_system.get("anti_patterns", "")
+    rules = format_applied_rules(design_system)
     
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -746,6 +1182,9 @@ def format_master_md(design_system: dict) -> str:
     if effects:
         lines.append(f"**Key Effects:** {effects}")
         lines.append("")
+    if rules:
+        lines.append(f"**Product Rules:** {rules}")
+        lines.append("")
     
     # Layout Pattern
     lines.append("### Page Pattern")
@@ -802,14 +1241,15 @@ def format_master_md(design_system: dict) -> str:
     return "\n".join(lines)
 
 
-def format_page_override_md(design_system: dict, page_name: str, page_query: str = None) -> str:
+def format_page_override_md(design_system: dict, page_name: str, page_query: str = None,
+                            searches: dict = None) -> str:
     """Format a page-specific override file with intelligent AI-generated content."""
     project = design_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
     
     # Detect page type and generate intelligent overrides
-    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system)
+    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system, searches)
     
     lines = []
     
@@ -911,31 +1351,54 @@ def format_page_override_md(design_system: dict, page_name: str, page_query: str
     return "\n".join(lines)
 
 
-def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict) -> dict:
+# Page override searches: domain -> max_results
+OVERRIDE_SEARCH_CONFIG = {
+    "style": 1,
+    "ux": 3,
+    "landing": 1
+}
+
+
+def _page_context(page_name: str, page_query: str) -> str:
+    """Combined search context for a page override."""
+    return f"{page_name.lower()} {(page_query or '').lower()}"
+
+
+def _page_override_searches(page_names: list, page_query: str) -> dict:
+    """
+    Run the style / ux / landing override searches for many pages at once.
+
+    Each domain index is resolved once and scores every page context in a
+    single batched call. Returns {page_name: {domain: search result}}.
+    """
+    contexts = [as_query(_page_context(name, page_query)) for name in page_names]
+    by_domain = {domain: search_many(contexts, domain, max_results)
+                 for domain, max_results in OVERRIDE_SEARCH_CONFIG.items()}
+    return {name: {domain: by_domain[domain][i] for domain in OVERRIDE_SEARCH_CONFIG}
+            for i, name in enumerate(page_names)}
+
+
+def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict,
+                                    searches: dict = None) -> dict:
     """
     Generate intelligent overrides based on page type using layered search.
     
     Uses the existing search infrastructure to find relevant style, UX, and layout
-    data instead of hardcoded page types.
+    data instead of hardcoded page types. Pass searches (from
+    _page_override_searches) to reuse results computed in a batch.
     """
-    from core import search
-    
-    page_lower = page_name.lower()
-    query_lower = (page_query or "").lower()
-    combined_context = f"{page_lower} {query_lower}"
-    
-    # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    combined_context = _page_context(page_name, page_query)
+    if searches is None:
+        searches = _page_override_searches([page_name], page_query)[page_name]
     
     # Extract results from search response
-    style_results = style_search.get("results", [])
-    ux_results = ux_search.get("results", [])
-    landing_results = landing_search.get("results", [])
+    style_results = searches["style"].get("results", [])
+    ux_results = searches["ux"].get("results", [])
+    landing_results = searches["landing"].get("results", [])
     
     # Detect page type from search results or context
-    page_type = _detect_page_type(combined_context, style_results)
+    page_type_candidates = get_page_classifier().rank(combined_context, style_results, page_name)
+    page_type = page_type_candidates[0]["page_type"] if page_type_candidates else "General"
     
     # Build overrides from search results
     layout = {}
@@ -1007,6 +1470,7 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
     
     return {
         "page_type": page_type,
+        "page_type_candidates": page_type_candidates[:3],
         "layout": layout,
         "spacing": spacing,
         "typography": typography,
@@ -1017,39 +1481,199 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
     }
 
 
-def _detect_page_type(context: str, style_results: list) -> str:
-    """Detect page type from context and search results."""
-    context_lower = context.lower()
-    
-    # Check for common page type patterns
-    page_patterns = [
-        (["dashboard", "admin", "analytics", "data", "metrics", "stats", "monitor", "overview"], "Dashboard / Data View"),
-        (["checkout", "payment", "cart", "purchase", "order", "billing"], "Checkout / Payment"),
-        (["settings", "profile", "account", "preferences", "config"], "Settings / Profile"),
-        (["landing", "marketing", "homepage", "hero", "home", "promo"], "Landing / Marketing"),
-        (["login", "signin", "signup", "register", "auth", "password"], "Authentication"),
-        (["pricing", "plans", "subscription", "tiers", "packages"], "Pricing / Plans"),
-        (["blog", "article", "post", "news", "content", "story"], "Blog / Article"),
-        (["product", "item", "detail", "pdp", "shop", "store"], "Product Detail"),
-        (["search", "results", "browse", "filter", "catalog", "list"], "Search Results"),
-        (["empty", "404", "error", "not found", "zero"], "Empty State"),
-    ]
-    
-    for keywords, page_type in page_patterns:
-        if any(kw in context_lower for kw in keywords):
-            return page_type
-    
-    # Fallback: try to infer from style results
-    if style_results:
-        style_name = style_results[0].get("Style Category", "").lower()
-        best_for = style_results[0].get("Best For", "").lower()
-        
-        if "dashboard" in best_for or "data" in best_for:
-            return "Dashboard / Data View"
-        elif "landing" in best_for or "marketing" in best_for:
-            return "Landing / Marketing"
-    
-    return "General"
+# ============ PAGE TYPE CLASSIFIER ============
+PAGE_TYPES_FILE = "page-types.csv"
+PAGE_NAME_WEIGHT = 2     # The page's own name outweighs the shared project query
+STYLE_HINT_WEIGHT = 0.5  # Style "Best For" hints are weaker evidence than the page context
+
+
+class PageTypeClassifier:
+    """
+    Page types from page-types.csv compiled into one alternation regex per
+    source (page context, style hints). A single finditer pass scores every
+    page type by the number of distinct keywords it matched.
+    """
+
+    def __init__(self, rows: list):
+        self.page_types = [row.get("Page Type", "") for row in rows]
+        self.pattern, self.keyword_types = self._compile(rows, "Keywords")
+        self.hint_pattern, self.hint_types = self._compile(rows, "Style Hints")
+
+    @staticmethod
+    def _compile(rows: list, column: str) -> tuple:
+        """Build (regex, {keyword: [page type index]}) for one column."""
+        keyword_types = {}
+        for idx, row in enumerate(rows):
+            for kw in row.get(column, "").split(","):
+                kw = kw.strip().lower()
+                if kw:
+                    keyword_types.setdefault(kw, []).append(idx)
+        if not keyword_types:
+            return None, keyword_types
+        # Longest first so "not found" wins over any shorter overlapping keyword;
+        # keywords match at word starts ("orders", "authentication")
+        alternation = "|".join(re.escape(kw) for kw in sorted(keyword_types, key=len, reverse=True))
+        return re.compile(rf"\b(?:{alternation})"), keyword_types
+
+    @staticmethod
+    def _score(pattern, keyword_types: dict, text: str, weight: float, scores: dict) -> None:
+        """Add weight per distinct keyword found in text to each of its page types."""
+        if pattern is None:
+            return
+        for kw in {m.group(0) for m in pattern.finditer(text.lower())}:
+            for idx in keyword_types[kw]:
+                scores[idx] = scores.get(idx, 0) + weight
+
+    def rank(self, context: str, style_results: list = None, page_name: str = None) -> list:
+        """
+        Ranked page-type candidates as [{"page_type", "score"}], best first
+        (ties keep file order). Keywords in page_name count PAGE_NAME_WEIGHT;
+        style hints are only consulted when nothing else matches.
+        """
+        scores = {}
+        self._score(self.pattern, self.keyword_types, context, 1, scores)
+        if page_name:
+            self._score(self.pattern, self.keyword_types, page_name, PAGE_NAME_WEIGHT - 1, scores)
+        if not scores and style_results:
+            self._score(self.hint_pattern, self.hint_types, style_results[0].get("Best For", ""),
+                        STYLE_HINT_WEIGHT, scores)
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+        return [{"page_type": self.page_types[idx], "score": score} for idx, score in ranked]
+
+
+_page_classifier = None
+_page_classifier_mtime = None
+_page_classifier_lock = threading.Lock()
+
+
+def get_page_classifier() -> PageTypeClassifier:
+    """Return the shared page-type classifier, recompiled when page-types.csv changes."""
+    global _page_classifier, _page_classifier_mtime
+    filepath = DATA_DIR / PAGE_TYPES_FILE
+    try:
+        mtime = filepath.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    if _page_classifier is None or mtime != _page_classifier_mtime:
+        with _page_classifier_lock:
+            if _page_classifier is None or mtime != _page_classifier_mtime:
+                rows = []
+                if mtime is not None:
+                    with open(filepath, 'r', encoding='utf-8') as f:
+                        rows = list(csv.DictReader(f))
+                _page_classifier = PageTypeClassifier(rows)
+                _page_classifier_mtime = mtime
+    return _page_classifier
+
+
+# ============ BATCH GENERATION ============
+def _split_pages(pages) -> list:
+    """Normalize a pages field (list or "a, b; c" string) into a list of names."""
+    if not pages:
+        return []
+    if isinstance(pages, str):
+        pages = pages.replace(";", ",").replace("|", ",").split(",")
+    return [str(p).strip() for p in pages if str(p).strip()]
+
+
+def load_manifest(manifest_path: str) -> list:
+    """
+    Load a batch manifest of projects.
+
+    JSON: a list (or {"projects": [...]}) of {"query", "project_name", "pages"}.
+    CSV: columns query, project_name, pages (pages separated by , ; or |).
+
+    Returns:
+        list of {"query", "project_name", "pages"} dicts
+
+    Raises:
+        ValueError: listing every invalid entry by its (1-based) index
+    """
+    path = Path(manifest_path)
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix.lower() == ".csv":
+            entries = list(csv.DictReader(f))
+        else:
+            entries = json.load(f)
+            if isinstance(entries, dict):
+                entries = entries.get("projects", [])
+    if not isinstance(entries, list):
+        raise ValueError(f"{manifest_path}: expected a list of projects")
+
+    projects, errors = [], []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict):
+            errors.append(f"entry {number}: expected an object, got {type(entry).__name__}")
+            continue
+        query = entry.get("query")
+        if not isinstance(query, str) or not query.strip():
+            errors.append(f"entry {number}: missing query")
+            continue
+        projects.append({
+            "query": query.strip(),
+            "project_name": str(entry.get("project_name") or "").strip() or None,
+            "pages": _split_pages(entry.get("pages"))
+        })
+    if errors:
+        raise ValueError(f"{manifest_path}: " + "; ".join(errors))
+    return projects
+
+
+def _generate_project(project: dict, output_dir: str = None, profiler: StageProfiler = None) -> dict:
+    """Generate and persist one manifest project; returns its timing report."""
+    report = {"project_name": project.get("project_name") or project["query"].upper(),
+              "query": project["query"], "pages": len(project.get("pages", [])),
+              "files": [], "written": 0, "status": "success"}
+    try:
+        start = time.perf_counter()
+        design_system = get_generator().generate(project["query"], project.get("project_name"), profiler)
+        report["generate_s"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = persist_design_system(design_system, None, output_dir, project["query"],
+                                       pages=project.get("pages", []), profiler=profiler)
+        report["files"].extend(result["created_files"])
+        report["written"] += sum(1 for status in result["files"].values() if status != "unchanged")
+        report["persist_s"] = time.perf_counter() - start
+    except Exception as e:
+        report["status"] = f"error: {e}"
+    return report
+
+
+def generate_batch(projects: list, output_dir: str = None, workers: int = 4,
+                   profiler: StageProfiler = None) -> dict:
+    """
+    Generate and persist design systems for many projects.
+
+    Each project's recommendation is computed once and all of its pages are
+    written from it. Projects run on a thread pool so they share the warm
+    search indexes and reasoning rules of this process.
+
+    Returns:
+        dict with per-project reports (in manifest order) and total wall time
+    """
+    get_generator()  # Warm shared state before fanning out
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ds-batch") as pool:
+        reports = list(pool.map(lambda p: _generate_project(p, output_dir, profiler), projects))
+    return {"projects": reports, "total_s": time.perf_counter() - start}
+
+
+def format_batch_summary(batch: dict) -> str:
+    """Format batch reports as a compact per-project timing table."""
+    reports = batch.get("projects", [])
+    lines = []
+    lines.append(f"{'PROJECT':<32} {'PAGES':>5} {'FILES':>5} {'WRITTEN':>7} {'GEN ms':>8} {'WRITE ms':>9}  STATUS")
+    lines.append("-" * 80)
+    for r in reports:
+        lines.append(f"{r['project_name'][:32]:<32} {r['pages']:>5} {len(r['files']):>5} {r.get('written', 0):>7} "
+                     f"{r.get('generate_s', 0) * 1000:>8.1f} {r.get('persist_s', 0) * 1000:>9.1f}  {r['status']}")
+    lines.append("-" * 80)
+    ok = sum(1 for r in reports if r["status"] == "success")
+    files = sum(len(r["files"]) for r in reports)
+    written = sum(r.get("written", 0) for r in reports)
+    lines.append(f"{ok}/{len(reports)} projects, {files} files ({written} written) in {batch.get('total_s', 0):.2f}s")
+    return "\n".join(lines)
 
 
 # ============ CLI SUPPORT ============
@@ -1059,7 +1683,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate Design System")
     parser.add_argument("query", help="Search query (e.g., 'SaaS dashboard')")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name")
-    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format")
+    parser.add_argument("--format", "-f", choices=["ascii", "markdown", "json"], default="ascii", help="Output format")
 
     args = parser.parse_args()
 
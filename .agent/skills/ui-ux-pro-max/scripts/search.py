@@ -3,22 +3,41 @@
 """
 UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
+       python search.py "<query>" [--domain <domain>] --token-budget 400
+       python search.py "<query>" --domain style --similar [--target color,typography]
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py "<query>" --design-system --persist [-p "Project Name"] --pages dashboard,pricing,login
+       python search.py --batch projects.json [--workers 4] [-o out/]
+
+Query syntax: "exact phrase", +required, -excluded (or NOT term), a OR b, a AND b
 
 Domains: style, prompt, color, chart, landing, product, ux, typography
 Stacks: html-tailwind, react, nextjs
 
+Token budget:
+  --token-budget  Pack the highest-value fields of the top results into ~N tokens
+                  (fields matching the query first, duplicate text dropped)
+
 Persistence (Master + Overrides pattern):
-  --persist    Save design system to design-system/MASTER.md
+  --persist    Save design system to design-system/MASTER.md (+ design-system.json sidecar)
   --page       Also create a page-specific override file in design-system/pages/
+  --pages      Comma-separated pages; all overrides come from one generation
+  --profile    Print per-stage wall/CPU time, CSV loads, index fits and output
+               sizes to stderr (--profile json for machine-readable output)
+  --batch      Persist design systems for every project in a JSON/CSV manifest
+               of (query, project_name, pages)
 """
 
 import argparse
 import sys
 import io
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
-from design_system import generate_design_system, persist_design_system
+from collections import defaultdict
+from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, BM25, search, search_stack
+from design_system import (get_generator, format_design_system, persist_design_system,
+                           load_manifest, generate_batch, format_batch_summary,
+                           StageProfiler, NULL_PROFILER, format_profile)
+from similarity import find_similar
 
 # Force UTF-8 for stdout/stderr to handle emojis on Windows (cp1252 default)
 if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
@@ -26,8 +45,83 @@ if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
 if sys.stderr.encoding and sys.stderr.encoding.lower() != 'utf-8':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
+# ============ TOKEN BUDGET ============
+CHARS_PER_TOKEN = 4       # Rough estimate for English/CSV text
+FIELD_OVERHEAD = 4        # "- **Key:** " markup cost per field
+MIN_FIELD_TOKENS = 12     # Don't bother emitting a field truncated below this
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 chars per token)"""
+    return max(1, (len(str(text)) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def _normalize(text):
+    """Normalize text for duplicate detection"""
+    return " ".join(str(text).lower().split())
+
+
+def pack_results(result, token_budget):
+    """
+    Select the highest-value fields of the top-ranked rows that fit in token_budget.
+
+    Every row's name field (first column) is placed first so the ranking stays
+    visible. Remaining fields are ranked by value density: fields matching query
+    terms first, higher-ranked rows weigh more, and field values already emitted
+    for an earlier row are dropped.
+
+    Returns list of (row_index, [(key, value), ...]) in original display order.
+    """
+    tokenizer = BM25()
+    query_tokens = set(tokenizer.parse_query(result.get("query", ""))["terms"])
+    rows = result.get("results", [])
+
+    candidates = []
+    for rank, row in enumerate(rows):
+        row_weight = 1.0 / (rank + 1)
+        for pos, (key, value) in enumerate(row.items()):
+            value_str = str(value).strip()
+            if not value_str:
+                continue
+            hits = len(query_tokens.intersection(tokenizer.tokenize(value_str)))
+            if hits:
+                field_weight = 3.0 + hits
+            elif pos == 0:
+                field_weight = 2.5
+            else:
+                field_weight = 1.0 / (1 + 0.1 * pos)
+            cost = estimate_tokens(value_str) + estimate_tokens(key) + FIELD_OVERHEAD
+            # Favor value density so one huge field can't starve the rest
+            candidates.append((row_weight * field_weight / cost ** 0.5, rank, pos, key, value_str))
+
+    candidates.sort(key=lambda c: (c[2] != 0, -c[0]))
+
+    remaining = token_budget
+    seen = set()
+    picked = defaultdict(dict)
+    for _, rank, pos, key, value_str in candidates:
+        fingerprint = _normalize(value_str)
+        if fingerprint in seen:
+            continue
+        overhead = estimate_tokens(key) + FIELD_OVERHEAD
+        cost = estimate_tokens(value_str) + overhead
+        if cost > remaining:
+            # Truncate to fit if a useful amount of the field still fits
+            room = remaining - overhead
+            if room < MIN_FIELD_TOKENS:
+                continue
+            value_str = value_str[:room * CHARS_PER_TOKEN - 3].rstrip() + "..."
+            cost = remaining
+        seen.add(fingerprint)
+        picked[rank][pos] = (key, value_str)
+        remaining -= cost
+        if remaining < MIN_FIELD_TOKENS:
+            break
+
+    return [(rank, [picked[rank][pos] for pos in sorted(picked[rank])]) for rank in sorted(picked)]
 
-def format_output(result):
+
+def format_output(result, token_budget=None):
     """Format results for Claude consumption (token-optimized)"""
     if "error" in result:
         return f"Error: {result['error']}"
@@ -41,6 +135,15 @@ def format_output(result):
         output.append(f"**Domain:** {result['domain']} | **Query:** {result['query']}")
     output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
 
+    if token_budget:
+        header_cost = estimate_tokens("\n".join(output))
+        for rank, fields in pack_results(result, max(0, token_budget - header_cost)):
+            output.append(f"### Result {rank + 1}")
+            for key, value_str in fields:
+                output.append(f"- **{key}:** {value_str}")
+            output.append("")
+        return "\n".join(output)
+
     for i, row in enumerate(result['results'], 1):
         output.append(f"### Result {i}")
         for key, value in row.items():
@@ -53,62 +156,124 @@ def format_output(result):
     return "\n".join(output)
 
 
+def domain_list(value):
+    """argparse type for --target: comma-separated domain names"""
+    domains = [d.strip() for d in value.split(",") if d.strip()]
+    unknown = [d for d in domains if d not in CSV_CONFIG]
+    if unknown or not domains:
+        raise argparse.ArgumentTypeError(
+            f"invalid domain(s) {', '.join(unknown) or repr(value)} (choose from {', '.join(CSV_CONFIG)})")
+    return domains
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
-    parser.add_argument("query", help="Search query")
+    parser.add_argument("query", nargs="?", help="Search query")
     parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
     parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--similar", action="store_true", help="Find rows similar to the top result (LSH over TF-IDF)")
+    parser.add_argument("--target", "-t", type=domain_list, default=None, help="Comma-separated domains to return similar rows from (default: same domain)")
+    parser.add_argument("--proximity", action="store_true", help="Boost results where query words appear close together")
+    parser.add_argument("--token-budget", "-b", type=int, default=None, help="Pack best fields of top results into ~N tokens")
     # Design system generation
     parser.add_argument("--design-system", "-ds", action="store_true", help="Generate complete design system recommendation")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name for design system output")
-    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format for design system")
+    parser.add_argument("--format", "-f", choices=["ascii", "markdown", "json"], default="ascii", help="Output format for design system")
     # Persistence (Master + Overrides pattern)
     parser.add_argument("--persist", action="store_true", help="Save design system to design-system/MASTER.md (creates hierarchical structure)")
     parser.add_argument("--page", type=str, default=None, help="Create page-specific override file in design-system/pages/")
+    parser.add_argument("--pages", type=str, default=None, help="Comma-separated page names for override files (e.g. dashboard,pricing)")
     parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
+    # Batch generation
+    parser.add_argument("--batch", type=str, default=None, help="Manifest (JSON/CSV) of projects to persist in one run")
+    parser.add_argument("--workers", "-w", type=int, default=4, help="Worker threads for --batch (default: 4)")
+    # Profiling
+    parser.add_argument("--profile", nargs="?", const="table", choices=["table", "json"], default=None, help="Report per-stage timings to stderr (table or json)")
 
     args = parser.parse_args()
+    if not args.query and not args.batch:
+        parser.error("query is required (unless --batch is used)")
 
-    # Design system takes priority
-    if args.design_system:
-        result = generate_design_system(
-            args.query, 
-            args.project_name, 
-            args.format,
-            persist=args.persist,
-            page=args.page,
-            output_dir=args.output_dir
-        )
-        print(result)
-        
-        # Print persistence confirmation
-        if args.persist:
-            project_slug = args.project_name.lower().replace(' ', '-') if args.project_name else "default"
-            print("\n" + "=" * 60)
-            print(f"✅ Design system persisted to design-system/{project_slug}/")
-            print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)")
-            if args.page:
-                page_filename = args.page.lower().replace(' ', '-')
-                print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)")
-            print("")
-            print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
-            print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.")
-            print("=" * 60)
-    # Stack search
-    elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
+    profiler = StageProfiler() if args.profile else None
+
+    # Batch mode: persist every project in the manifest
+    if args.batch:
+        try:
+            with (profiler or NULL_PROFILER).stage("load manifest"):
+                projects = load_manifest(args.batch)
+        except ValueError as e:
+            parser.error(str(e))
+        batch = generate_batch(projects, args.output_dir, args.workers, profiler)
         if args.json:
             import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+            print(json.dumps(batch, indent=2, ensure_ascii=False))
         else:
-            print(format_output(result))
-    # Domain search
+            print(format_batch_summary(batch))
+    # Design system takes priority
+    elif args.design_system:
+        design_system = get_generator().generate(args.query, args.project_name, profiler)
+        with (profiler or NULL_PROFILER).stage("formatting"):
+            output = format_design_system(design_system, args.format)
+        (profiler or NULL_PROFILER).record_output("stdout", output)
+        print(output)
+        
+        # Persist and print which files changed
+        if args.persist:
+            pages = [p.strip() for p in (args.pages or "").split(",") if p.strip()]
+            persisted = persist_design_system(design_system, args.page, args.output_dir, args.query,
+                                              pages=pages, profiler=profiler)
+            project_slug = design_system.get("project_name", "default").lower().replace(' ', '-')
+            # Keep stdout pure JSON when --format json
+            report = sys.stderr if args.format == "json" else sys.stdout
+            print("\n" + "=" * 60, file=report)
+            print(f"✅ Design system persisted to design-system/{project_slug}/", file=report)
+            for path, status in persisted["files"].items():
+                if path.endswith("MASTER.md"):
+                    label = "Global Source of Truth"
+                elif path.endswith(".json"):
+                    label = "Structured Data"
+                else:
+                    label = "Page Overrides"
+                print(f"   📄 {path} ({label}) — {status}", file=report)
+            print("", file=report)
+            print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.", file=report)
+            print(f"   If exists, its rules override MASTER.md. Otherwise, use MASTER.md.", file=report)
+            print("=" * 60, file=report)
+    # Stack, similar-row and domain searches share the same output path
     else:
-        result = search(args.query, args.domain, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+        stages = profiler or NULL_PROFILER
+        # Stack search
+        if args.stack:
+            with stages.stage("search"):
+                result = search_stack(args.query, args.stack, args.max_results)
+        # Similar rows ("more like this")
+        elif args.similar:
+            with stages.stage("search"):
+                top = search(args.query, args.domain, 1)
+            if "error" in top:
+                result = top
+            elif not top["results"]:
+                result = {"error": f"No {top['domain']} row matches: {args.query}"}
+            else:
+                with stages.stage("similar"):
+                    result = find_similar(top["results"][0], top["domain"], args.target, args.max_results)
+        # Domain search
         else:
-            print(format_output(result))
+            with stages.stage("search"):
+                result = search(args.query, args.domain, args.max_results, proximity=args.proximity)
+        with stages.stage("formatting"):
+            if args.json:
+                import json
+                output = json.dumps(result, indent=2, ensure_ascii=False)
+            else:
+                output = format_output(result, args.token_budget)
+        stages.record_output("stdout", output)
+        print(output)
+
+    if profiler:
+        import json
+        profile = profiler.to_dict()
+        print("", file=sys.stderr)
+        print(json.dumps(profile, indent=2) if args.profile == "json" else format_profile(profile), file=sys.stderr)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Similarity - "More like this" over CSV rows using TF-IDF vectors
+indexed with random-projection LSH (locality-sensitive hashing).
+
+Usage:
+    from similarity import find_similar
+    result = find_similar(style_row, "style")                       # Similar styles
+    result = find_similar(style_row, "style", target_domains=["color"])  # Compatible palettes
+
+Pure Python; NumPy is used for the projections when available. No model downloads.
+"""
+
+import random
+import threading
+from collections import defaultdict
+from math import log, sqrt
+
+from core import CSV_CONFIG, DATA_DIR, MAX_RESULTS, BM25, get_index
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# ============ CONFIGURATION ============
+LSH_TABLES = 16       # Independent hash tables (more = better recall)
+LSH_MAX_BITS = 8      # Cap on hyperplanes per table (more = smaller buckets)
+LSH_SEED = 1337       # Fixed seed so signatures are stable across runs
+MIN_CANDIDATES = 12   # Probe neighbouring buckets below this many candidates
+
+
+# ============ LSH INDEX ============
+class SimilarityIndex:
+    """TF-IDF vectors for rows of one or more domains, bucketed by LSH signatures."""
+
+    def __init__(self, domains=None, tables=LSH_TABLES, bits=None, seed=LSH_SEED):
+        self.domains = list(domains or CSV_CONFIG.keys())
+        self.tables = tables
+        self.bits = bits  # None = sized to the corpus in _build()
+        self.seed = seed
+        self.tokenizer = BM25()
+        self.rows = []        # (domain, output row dict)
+        self.keys = []        # (domain, name) used to skip the query row itself
+        self.vectors = []     # {term: weight}, L2-normalized
+        self.idf = {}
+        self.buckets = [defaultdict(list) for _ in range(tables)]
+        self._planes = {}     # term -> [gaussian] * (tables * bits)
+        self._build()
+
+    def _build(self):
+        """Load rows, compute TF-IDF vectors and LSH buckets."""
+        docs = []
+        for domain in self.domains:
+            config = CSV_CONFIG[domain]
+            filepath = DATA_DIR / config["file"]
+            if not filepath.exists():
+                continue
+            rows, _ = get_index(filepath, config["search_cols"])  # Shares core's row cache
+            for row in rows:
+                output = {col: row.get(col, "") for col in config["output_cols"] if col in row}
+                self.rows.append((domain, output))
+                self.keys.append((domain, row.get(config["output_cols"][0], "")))
+                docs.append(self.tokenizer.tokenize(" ".join(str(row.get(col, "")) for col in config["search_cols"])))
+
+        n = len(docs)
+        if self.bits is None:
+            # ~16+ rows per bucket: short rows have low cosine similarity, so
+            # narrow buckets would cost far more recall than they save work
+            self.bits = max(2, min(LSH_MAX_BITS, int(log(max(n, 2), 2)) - 4))
+        doc_freqs = defaultdict(int)
+        for tokens in docs:
+            for term in set(tokens):
+                doc_freqs[term] += 1
+        self.idf = {term: log((n + 1) / (freq + 1)) + 1 for term, freq in doc_freqs.items()}
+
+        self.vectors = [self._vectorize(tokens) for tokens in docs]
+        for idx, signature in enumerate(self._signatures(self.vectors)):
+            for table, bucket in enumerate(signature):
+                self.buckets[table][bucket].append(idx)
+
+    def _vectorize(self, tokens):
+        """Sparse, L2-normalized TF-IDF vector (unknown terms are ignored)."""
+        counts = defaultdict(int)
+        for term in tokens:
+            if term in self.idf:
+                counts[term] += 1
+        vector = {term: (1 + log(tf)) * self.idf[term] for term, tf in counts.items()}
+        norm = sqrt(sum(w * w for w in vector.values()))
+        return {term: w / norm for term, w in vector.items()} if norm else {}
+
+    def _plane(self, term):
+        """Per-term hyperplane coefficients, derived deterministically from the seed."""
+        if term not in self._planes:
+            rng = random.Random(f"{self.seed}:{term}")
+            self._planes[term] = [rng.gauss(0, 1) for _ in range(self.tables * self.bits)]
+        return self._planes[term]
+
+    def _signatures(self, vectors):
+        """Project vectors onto the random hyperplanes; one bucket id per table."""
+        width = self.tables * self.bits
+        if np is not None and vectors:
+            projections = np.zeros((len(vectors), width))
+            for i, vector in enumerate(vectors):
+                if vector:
+                    terms = list(vector)
+                    weights = np.fromiter((vector[t] for t in terms), dtype=float, count=len(terms))
+                    projections[i] = weights @ np.array([self._plane(t) for t in terms])
+            projections = (projections > 0).tolist()
+        else:
+            projections = []
+            for vector in vectors:
+                sums = [0.0] * width
+                for term, weight in vector.items():
+                    for k, coef in enumerate(self._plane(term)):
+                        sums[k] += weight * coef
+                projections.append([value > 0 for value in sums])
+
+        signatures = []
+        for bits in projections:
+            signature = []
+            for table in range(self.tables):
+                bucket = 0
+                for bit in bits[table * self.bits:(table + 1) * self.bits]:
+                    bucket = (bucket << 1) | int(bit)
+                signature.append(bucket)
+            signatures.append(signature)
+        return signatures
+
+    def _candidates(self, signature):
+        """Row ids sharing a bucket; probe 1-bit neighbours if too few."""
+        candidates = set()
+        for table, bucket in enumerate(signature):
+            candidates.update(self.buckets[table].get(bucket, ()))
+        if len(candidates) < MIN_CANDIDATES:
+            for table, bucket in enumerate(signature):
+                for bit in range(self.bits):
+                    candidates.update(self.buckets[table].get(bucket ^ (1 << bit), ()))
+        return candidates
+
+    def query(self, text, target_domains=None, exclude=None, max_results=MAX_RESULTS):
+        """Approximate nearest rows to text, re-ranked by exact cosine similarity."""
+        vector = self._vectorize(self.tokenizer.tokenize(text))
+        if not vector:
+            return []
+        targets = set(target_domains) if target_domains else None
+
+        scored = []
+        for idx in self._candidates(self._signatures([vector])[0]):
+            domain = self.rows[idx][0]
+            if (targets and domain not in targets) or self.keys[idx] == exclude:
+                continue
+            row_vector = self.vectors[idx]
+            if len(row_vector) > len(vector):
+                sim = sum(w * row_vector.get(t, 0) for t, w in vector.items())
+            else:
+                sim = sum(w * vector.get(t, 0) for t, w in row_vector.items())
+            if sim > 0:
+                scored.append((sim, idx))
+
+        scored.sort(key=lambda x: (-x[0], x[1]))
+        return [(self.rows[idx][0], self.rows[idx][1], sim) for sim, idx in scored[:max_results]]
+
+
+_INDEX_CACHE = {}  # domains -> (source mtimes, SimilarityIndex)
+_INDEX_LOCK = threading.Lock()
+
+
+def _source_mtimes(domains):
+    """mtime of each domain's CSV (None if missing), used to detect changed data."""
+    mtimes = []
+    for domain in domains:
+        filepath = DATA_DIR / CSV_CONFIG[domain]["file"]
+        mtimes.append(filepath.stat().st_mtime_ns if filepath.exists() else None)
+    return tuple(mtimes)
+
+
+def get_similarity_index(domains=None):
+    """Return a cached SimilarityIndex for the given domains, rebuilt when a CSV changes."""
+    key = tuple(domains or CSV_CONFIG.keys())
+    mtimes = _source_mtimes(key)
+    cached = _INDEX_CACHE.get(key)
+    if cached and cached[0] == mtimes:
+        return cached[1]
+    with _INDEX_LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached and cached[0] == mtimes:
+            return cached[1]
+        index = SimilarityIndex(key)
+        _INDEX_CACHE[key] = (mtimes, index)
+    return index
+
+
+# ============ PUBLIC API ============
+def find_similar(row, domain, target_domains=None, max_results=MAX_RESULTS):
+    """
+    Find rows similar to a given row (e.g. a style picked by DesignSystemGenerator).
+
+    Args:
+        row: Row dict as returned by search() (any subset of its columns works)
+        domain: Domain the row comes from (used to pick its text columns)
+        target_domains: Domains to return rows from (defaults to the row's own domain)
+        max_results: Maximum similar rows to return
+
+    Returns:
+        dict with domain, query, count and results; each result row also carries
+        "Domain" and "Similarity" keys
+    """
+    config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
+    targets = list(target_domains or [domain])
+    text_cols = [col for col in config["search_cols"] if col in row] or list(row)
+    name = row.get(config["output_cols"][0], "")
+
+    index = get_similarity_index(sorted(set(targets) | {domain}))
+    matches = index.query(" ".join(str(row.get(col, "")) for col in text_cols),
+                          target_domains=targets, exclude=(domain, name), max_results=max_results)
+
+    results = []
+    for match_domain, match_row, sim in matches:
+        result = dict(match_row)
+        result["Domain"] = match_domain
+        result["Similarity"] = round(sim, 3)
+        results.append(result)
+
+    return {
+        "domain": domain,
+        "query": name,
+        "file": ", ".join(CSV_CONFIG[d]["file"] for d in targets if d in CSV_CONFIG),
+        "count": len(results),
+        "results": results
+    }